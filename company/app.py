@@ -13,16 +13,38 @@ Streamlit 前端：将现有功能封装为网页应用
 """
 
 import streamlit as st
+import datetime
 import io
-import tempfile
 import os
-from parser import parse_text_list
+from order_batch import IncrementalOrderParser
 from price_table_handler import read_price_excel
 from excel_handler import read_purchase_price_excel
-from profit_calculator import calculate_profit_and_generate_excel
+from profit_calculator import compute_profit_report, render_csv, render_excel, render_json, render_parquet
+from match_cache import MatchCache
+from matcher import build_price_index
+from table_cache import TableCache
+from price_history import PriceHistory
+from price_diff import diff_price_tables, impacted_orders
 
 # OCR 模块已移除
 
+# 定价表、进价表可上传的文件类型
+TABLE_FILE_TYPES = ['xlsx', 'xls', 'csv', 'parquet']
+
+# 利润表下载格式：(导出函数, 文件名, MIME 类型)
+EXPORT_FORMATS = {
+    'Excel': (render_excel, '利润表.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'CSV': (render_csv, '利润表.csv', 'text/csv'),
+    'JSON': (render_json, '利润表.json', 'application/json'),
+    'Parquet': (render_parquet, '利润表.parquet', 'application/octet-stream'),
+}
+
+
+@st.cache_resource
+def get_table_cache():
+    """所有会话共用的价格表缓存；设置 COMPANY_TABLE_CACHE_DIR 环境变量可启用磁盘缓存"""
+    return TableCache(disk_dir=os.environ.get('COMPANY_TABLE_CACHE_DIR'))
+
 
 def ensure_session_state():
     if 'text_data' not in st.session_state:
@@ -31,6 +53,31 @@ def ensure_session_state():
         st.session_state['price_table'] = {}
     if 'purchase_table' not in st.session_state:
         st.session_state['purchase_table'] = {}
+    if 'price_index' not in st.session_state:
+        st.session_state['price_index'] = None
+    if 'purchase_index' not in st.session_state:
+        st.session_state['purchase_index'] = None
+    if 'order_parser' not in st.session_state:
+        st.session_state['order_parser'] = IncrementalOrderParser()
+
+
+def current_orders():
+    """最近解析的订单；还没有解析时按当前文字增量解析"""
+    return st.session_state.get('last_orders') or st.session_state['order_parser'].parse(
+        st.session_state.get('text_data', ''))
+
+
+def session_match_memo(price_index, purchase_index):
+    """
+    本会话的菜品匹配结果，定价表、进价表（或别名表）变化后自动清空
+
+    修改订单文字后重新生成时，只有新出现的菜品名需要匹配。
+    """
+    key = (price_index.fingerprint, purchase_index.fingerprint)
+    if st.session_state.get('match_memo_key') != key:
+        st.session_state['match_memo_key'] = key
+        st.session_state['match_memo'] = {}
+    return st.session_state['match_memo']
 
 
 def sidebar_instructions():
@@ -52,8 +99,10 @@ def page_input_orders():
         if st.button('解析文字'):
             st.session_state['text_data'] = text
             try:
-                orders = parse_text_list(text)
-                st.success(f'解析完成：共 {len(orders)} 条记录')
+                # 只解析上次之后新增或修改过的行
+                parser = st.session_state['order_parser']
+                orders = parser.parse(text)
+                st.success(f'解析完成：共 {len(orders)} 条记录（重新解析 {parser.last_parsed_lines} 行）')
                 st.experimental_set_query_params(parsed=len(orders))
                 st.session_state['last_orders'] = orders
             except Exception as e:
@@ -66,28 +115,48 @@ def page_input_orders():
 
     if st.session_state.get('last_orders'):
         st.write('示例解析（前20条）：')
-        import pandas as pd
-        df = pd.DataFrame(st.session_state['last_orders'])
+        df = st.session_state['last_orders'].to_frame()
         st.dataframe(df.head(20))
 
 
+def save_to_history(kind, table_key, label):
+    """把当前加载的价格表按生效日期保存到价格历史（只写入变化的菜品）"""
+    table = st.session_state.get(table_key)
+    if not table:
+        return
+    effective_date = st.date_input(f'{label}生效日期', key=f'{kind}_history_date')
+    if st.button('保存到价格历史', key=f'{kind}_history_save'):
+        try:
+            summary = PriceHistory().apply(kind, effective_date, table)
+            st.success(f"已保存 {effective_date} 的{label}：新增 {summary['added']} 个，改价 {summary['changed']} 个，"
+                       f"删除 {summary['removed']} 个")
+        except Exception as e:
+            st.error(f'保存价格历史失败：{e}')
+
+
 def page_price_table():
     st.header('2. 定价表（Excel）')
-    st.markdown('请上传定价表 Excel 文件。')
+    st.markdown('请上传定价表 Excel 文件（也支持 ERP 导出的 CSV、Parquet 文件）。')
     
-    excel_file = st.file_uploader('上传定价表 Excel', type=['xlsx', 'xls'])
+    excel_file = st.file_uploader('上传定价表 Excel', type=TABLE_FILE_TYPES)
+    all_sheets = st.checkbox('读取全部工作表（每个品类一张表）', key='price_all_sheets')
 
     if excel_file is not None:
         with st.spinner('正在读取 Excel...'):
             try:
-                # pandas 能接受 BytesIO
-                bytes_io = io.BytesIO(excel_file.read())
-                price_table = read_price_excel(bytes_io)
+                # 相同内容的文件只解析一次，网页刷新时直接取缓存
+                price_table, price_index = get_table_cache().get_or_load(
+                    excel_file.getvalue(), 'price-all-sheets' if all_sheets else 'price',
+                    lambda data: read_price_excel(io.BytesIO(data), all_sheets=all_sheets,
+                                                  file_format=os.path.splitext(excel_file.name)[1]))
                 st.session_state['price_table'] = price_table
+                st.session_state['price_index'] = price_index
                 st.success(f'定价表加载完成，共 {len(price_table)} 个菜品')
             except Exception as e:
                 st.error(f'读取 Excel 失败：{e}')
 
+    save_to_history('price', 'price_table', '定价表')
+
     if st.session_state.get('price_table'):
         import pandas as pd
         df = pd.DataFrame(list(st.session_state['price_table'].items()), columns=['菜品', '定价'])
@@ -96,32 +165,85 @@ def page_price_table():
 
 def page_purchase_table():
     st.header('3. 进价表（上传 Excel）')
-    purchase_file = st.file_uploader('上传进价表 Excel', type=['xlsx', 'xls'], key='purchase')
+    purchase_file = st.file_uploader('上传进价表 Excel', type=TABLE_FILE_TYPES, key='purchase')
+    streaming = st.checkbox('大文件流式读取（仅 xlsx，适合几万行的平台导出表）', key='purchase_streaming')
+    all_sheets = st.checkbox('读取全部工作表（每个品类一张表）', key='purchase_all_sheets')
     if purchase_file is not None:
         with st.spinner('正在读取进价表...'):
             try:
-                bytes_io = io.BytesIO(purchase_file.read())
-                purchase_table = read_purchase_price_excel(bytes_io)
+                kind = 'purchase' + ('-streaming' if streaming else '') + ('-all-sheets' if all_sheets else '')
+                purchase_table, purchase_index = get_table_cache().get_or_load(
+                    purchase_file.getvalue(), kind,
+                    lambda data: read_purchase_price_excel(io.BytesIO(data), streaming=streaming,
+                                                           all_sheets=all_sheets,
+                                                           file_format=os.path.splitext(purchase_file.name)[1]))
                 st.session_state['purchase_table'] = purchase_table
+                st.session_state['purchase_index'] = purchase_index
                 st.success(f'进价表加载完成，共 {len(purchase_table)} 个菜品')
             except Exception as e:
                 st.error(f'读取进价表失败：{e}')
 
+    save_to_history('purchase', 'purchase_table', '进价表')
+
     if st.session_state.get('purchase_table'):
         import pandas as pd
         df = pd.DataFrame(list(st.session_state['purchase_table'].items()), columns=['菜品', '进价'])
         st.dataframe(df.head(200))
 
 
+def page_price_changes():
+    st.header('价格变化')
+    st.markdown('将当前上传的定价表、进价表与价格历史中某天的版本比较，并列出价格会变化的订单行。')
+    compare_date = st.date_input('对比日期', value=datetime.date.today() - datetime.timedelta(days=1),
+                                 key='compare_date')
+    history = PriceHistory()
+
+    tables = {}
+    for kind, table_key, index_key, label in (('price', 'price_table', 'price_index', '定价表'),
+                                              ('purchase', 'purchase_table', 'purchase_index', '进价表')):
+        current = st.session_state.get(index_key) or st.session_state.get(table_key)
+        previous = history.as_of(kind, compare_date)
+        st.subheader(label)
+        if not current:
+            st.info(f'请先上传{label}')
+        elif previous is None:
+            st.info(f'价格历史中没有 {compare_date} 及之前的{label}')
+        else:
+            diff = diff_price_tables(previous, current)
+            counts = diff['变化'].value_counts()
+            st.write('，'.join(f'{change} {counts.get(change, 0)} 个' for change in ('新增', '删除', '改价', '改名')))
+            st.dataframe(diff)
+            tables[kind] = (previous, current)
+
+    orders = current_orders()
+    if orders and len(tables) == 2:
+        st.subheader('受影响的订单')
+        impacted = impacted_orders(orders, tables['price'][0], tables['price'][1],
+                                   tables['purchase'][0], tables['purchase'][1])
+        st.write(f'共 {len(impacted)} 行订单的定价或进价会变化')
+        st.dataframe(impacted)
+
+
 def page_generate():
     st.header('4. 生成并下载利润表')
     st.markdown('请先在“输入订单”“定价表”“进价表”三个步骤完成数据准备，然后执行生成。')
+    use_history = st.checkbox('使用价格历史中某天的定价表和进价表（无需重新上传）', key='use_history')
+    history_date = st.date_input('价格日期', key='generate_history_date') if use_history else None
+    streaming = st.checkbox('大表逐行写入（内存占用不随行数增长，适合几万行的月末汇总）', key='generate_streaming')
+    by_unit = st.checkbox('按单位分表（汇总表 + 每个单位一个工作表，便于发给各食堂）', key='generate_by_unit')
     col1, col2 = st.columns([1, 1])
     with col1:
         if st.button('生成利润表'):
-            orders = st.session_state.get('last_orders') or parse_text_list(st.session_state.get('text_data', ''))
-            price_table = st.session_state.get('price_table', {})
-            purchase_table = st.session_state.get('purchase_table', {})
+            st.session_state['last_report'] = None
+            orders = current_orders()
+            if use_history:
+                history = PriceHistory()
+                price_table = history.as_of('price', history_date) or {}
+                purchase_table = history.as_of('purchase', history_date) or {}
+            else:
+                # 优先使用上传时已建立的匹配索引
+                price_table = st.session_state.get('price_index') or st.session_state.get('price_table', {})
+                purchase_table = st.session_state.get('purchase_index') or st.session_state.get('purchase_table', {})
 
             if not orders:
                 st.error('订单为空，请先解析或粘贴订单')
@@ -131,16 +253,42 @@ def page_generate():
                 st.error('进价表为空，请上传进价 Excel')
             else:
                 try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-                        tmp_path = tmp.name
-                    total_profit = calculate_profit_and_generate_excel(orders, price_table, purchase_table, tmp_path)
-                    st.success(f'利润表生成成功，总利润：¥{total_profit:.2f}\n 可点击下方按钮下载')
-                    with open(tmp_path, 'rb') as f:
-                        data = f.read()
-                    st.download_button('下载利润表（Excel）', data, file_name='利润表.xlsx', mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-                    # 保留文件一段时间，让用户下载
+                    price_table = build_price_index(price_table)
+                    purchase_table = build_price_index(purchase_table)
+                    # 计算一次，预览和各种格式的下载共用同一份结果
+                    st.session_state['last_report'] = compute_profit_report(
+                        orders, price_table, purchase_table, match_cache=MatchCache(),
+                        match_memo=session_match_memo(price_table, purchase_table))
+                    st.session_state['report_exports'] = {}
                 except Exception as e:
                     st.error(f'生成失败：{e}')
+
+        report = st.session_state.get('last_report')
+        if report is not None:
+            st.success(f'利润表生成成功，总利润：¥{report.total_profit:.2f}\n 可点击下方按钮下载')
+            if report.unmatched_dishes:
+                st.warning('以下菜品的定价或进价未匹配到（表中显示为 000000）：' + '、'.join(report.unmatched_dishes))
+            export_format = st.selectbox('下载格式', list(EXPORT_FORMATS), key='export_format')
+            renderer, file_name, mime = EXPORT_FORMATS[export_format]
+            # 利润表直接写入内存，不经过临时文件；同一格式只生成一次
+            export_key = (export_format, streaming, by_unit)
+            exports = st.session_state.setdefault('report_exports', {})
+            if export_key not in exports:
+                output = io.BytesIO()
+                try:
+                    if export_format == 'Excel':
+                        renderer(report, output, streaming=streaming, by_unit=by_unit)
+                    else:
+                        renderer(report, output)
+                    exports[export_key] = output.getvalue()
+                except Exception as e:
+                    st.error(f'导出失败：{e}')
+            if export_key in exports:
+                st.download_button(f'下载利润表（{export_format}）', exports[export_key], file_name=file_name, mime=mime)
+            st.write('各单位小计：')
+            st.dataframe(report.by_unit())
+            st.write('利润表预览（前200行）：')
+            st.dataframe(report.to_display_frame().head(200))
     with col2:
         st.markdown('开发者提示：')
         st.write('- 可以考虑备份生成的利润表。')
@@ -153,7 +301,7 @@ def main():
 
     st.title('🥬 蔬菜公司 Excel 助手（Web）')
 
-    page = st.sidebar.selectbox('选择功能', ['输入订单', '定价表', '进价表', '生成与下载'])
+    page = st.sidebar.selectbox('选择功能', ['输入订单', '定价表', '进价表', '价格变化', '生成与下载'])
 
     if page == '输入订单':
         page_input_orders()
@@ -161,6 +309,8 @@ def main():
         page_price_table()
     elif page == '进价表':
         page_purchase_table()
+    elif page == '价格变化':
+        page_price_changes()
     elif page == '生成与下载':
         page_generate()
 
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成模块 - 把一个目录中每天的订单文字批量生成利润表，不需要打开网页
+
+每个订单文件按文件名中的日期生成 "YYYY.M.D利润表.xlsx"（与 利润表/ 目录中已有的命名相同）。
+定价表、进价表（或价格历史中用到的各个版本）在主进程中只读取、建立匹配索引一次，
+进程池中的每个子进程启动时接收一份，之后处理各天的订单都直接使用。
+"""
+
+import datetime
+import os
+import re
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from excel_handler import read_purchase_price_excel
+from matcher import PriceIndex
+from order_batch import OrderBatch
+from price_table_handler import read_price_excel
+from profit_calculator import compute_profit_report, render_excel
+from table_loader import CSV_ENCODINGS
+
+# 订单文字文件的扩展名
+ORDER_FILE_SUFFIXES = ('.txt',)
+
+# 文件名中的日期：2025.10.8、2025-10-08、20251008、2025年10月8日
+DATE_PATTERN = re.compile(r'(\d{4})[.\-_/年]?(\d{1,2})[.\-_/月]?(\d{1,2})')
+
+# 子进程中共用的匹配索引 {'price': {版本: PriceIndex}, 'purchase': {...}} 及匹配结果
+_worker_tables = None
+_worker_memos = {}
+
+
+def order_file_date(file_name):
+    """
+    从文件名中取出日期
+
+    参数:
+        file_name (str): 文件名
+
+    返回:
+        date or None: 日期，文件名中没有合法日期时返回 None
+    """
+    match = DATE_PATTERN.search(os.path.basename(file_name))
+    if not match:
+        return None
+    try:
+        return datetime.date(*(int(part) for part in match.groups()))
+    except ValueError:
+        return None
+
+
+def profit_file_name(day):
+    """某天利润表的文件名，如 2025.10.8利润表.xlsx"""
+    return f'{day.year}.{day.month}.{day.day}利润表.xlsx'
+
+
+def read_order_text(path):
+    """读取订单文字，依次尝试 UTF-8 和 GB18030 编码"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    for encoding in CSV_ENCODINGS[:-1]:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    return data.decode(CSV_ENCODINGS[-1])
+
+
+def find_order_files(order_dir):
+    """
+    列出目录中的订单文件
+
+    返回:
+        tuple: ([(日期, 文件路径), ...] 按日期排序, [文件名中没有日期的文件路径])
+    """
+    dated = []
+    undated = []
+    for name in sorted(os.listdir(order_dir)):
+        path = os.path.join(order_dir, name)
+        if name.startswith('.') or not name.lower().endswith(ORDER_FILE_SUFFIXES) or not os.path.isfile(path):
+            continue
+        day = order_file_date(name)
+        if day is None:
+            undated.append(path)
+        else:
+            dated.append((day, path))
+    dated.sort()
+    return dated, undated
+
+
+def _history_versions(history, kind, days):
+    """
+    每天生效的价格历史版本，并把用到的每个版本各读取一次
+
+    返回:
+        tuple: ({版本日期: PriceIndex}, [每天对应的版本日期，没有版本时为 None])
+    """
+    versions = [valid_from for valid_from, _ in history.versions(kind)]
+    day_versions = []
+    for day in days:
+        i = bisect_right(versions, day.isoformat())
+        day_versions.append(versions[i - 1] if i else None)
+    indexes = {version: PriceIndex(history.as_of(kind, version))
+               for version in dict.fromkeys(day_versions) if version is not None}
+    return indexes, day_versions
+
+
+def _init_worker(tables):
+    """子进程启动时接收共用的匹配索引"""
+    global _worker_tables
+    _worker_tables = tables
+    _worker_memos.clear()
+
+
+def _generate_day(order_path, output_path, price_version, purchase_version, streaming, by_unit):
+    """
+    生成一天的利润表（在子进程中运行）
+
+    返回:
+        tuple: (总利润, 订单行数, 未匹配菜品数)
+    """
+    try:
+        price_index = _worker_tables['price'][price_version]
+        purchase_index = _worker_tables['purchase'][purchase_version]
+        # 同一对价格表在本进程中处理过的菜品不再重复匹配
+        memo = _worker_memos.setdefault((price_version, purchase_version), {})
+        orders = OrderBatch.from_text(read_order_text(order_path))
+        report = compute_profit_report(orders, price_index, purchase_index, match_memo=memo)
+        render_excel(report, output_path, streaming=streaming, by_unit=by_unit)
+        return report.total_profit, len(report), len(report.unmatched_dishes)
+    except Exception as e:
+        raise Exception(f"生成 {os.path.basename(output_path)} 失败: {e}")
+
+
+def run_batch(order_dir, output_dir, price_file=None, purchase_file=None, history=None, max_workers=None,
+              streaming=False, by_unit=False):
+    """
+    批量生成利润表
+
+    定价表、进价表分别优先使用指定的文件，没有指定时使用价格历史中各天生效的版本。
+
+    参数:
+        order_dir (str): 订单文字目录，每天一个文件，文件名包含日期
+        output_dir (str): 利润表输出目录
+        price_file (str): 定价表文件（Excel、CSV 或 Parquet）
+        purchase_file (str): 进价表文件
+        history (PriceHistory): 价格历史
+        max_workers (int): 最多使用的进程数，默认与 CPU 核数相同；1 表示不使用进程池
+        streaming (bool): 是否逐行写入 Excel
+        by_unit (bool): 是否按单位分表
+
+    返回:
+        list: 每个订单文件一项 (订单文件, 利润表文件, 结果)，结果为 (总利润, 订单行数, 未匹配菜品数) 或错误信息；
+              文件名中没有日期的文件跳过，利润表文件为 None
+    """
+    if price_file is None and history is None:
+        raise ValueError('请指定定价表文件或价格历史')
+    if purchase_file is None and history is None:
+        raise ValueError('请指定进价表文件或价格历史')
+
+    dated, undated = find_order_files(order_dir)
+    results = [(path, None, '文件名中没有日期（如 2025.10.8.txt）') for path in undated]
+    if not dated:
+        return results
+    days = [day for day, _ in dated]
+
+    # 价格表在主进程中只读取、建立索引一次
+    tables = {}
+    day_versions = {}
+    for kind, table_file, reader in (('price', price_file, read_price_excel),
+                                     ('purchase', purchase_file, read_purchase_price_excel)):
+        if table_file is not None:
+            tables[kind] = {'file': PriceIndex(reader(table_file))}
+            day_versions[kind] = ['file'] * len(days)
+        else:
+            tables[kind], day_versions[kind] = _history_versions(history, kind, days)
+
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    for i, (day, order_path) in enumerate(dated):
+        output_path = os.path.join(output_dir, profit_file_name(day))
+        price_version, purchase_version = day_versions['price'][i], day_versions['purchase'][i]
+        if price_version is None or purchase_version is None:
+            results.append((order_path, output_path, f'价格历史中没有 {day} 及之前的定价表或进价表'))
+        else:
+            tasks.append((order_path, output_path, price_version, purchase_version, streaming, by_unit))
+
+    workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(tables)
+        for task in tasks:
+            try:
+                results.append((task[0], task[1], _generate_day(*task)))
+            except Exception as e:
+                results.append((task[0], task[1], str(e)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tables,)) as pool:
+            futures = {pool.submit(_generate_day, *task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    results.append((task[0], task[1], future.result()))
+                except Exception as e:
+                    results.append((task[0], task[1], str(e)))
+
+    results.sort(key=lambda result: (order_file_date(result[0]) or datetime.date.min, result[0]))
+    return results
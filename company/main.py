@@ -6,17 +6,23 @@
 说明：
 - 请使用 `streamlit run app.py` 启动网页界面（仓库中已包含 `app.py`）。
 - 运行此脚本会尝试调用系统的 `streamlit` 命令以启动服务，若未安装会给出提示。
+- `python main.py batch 订单目录 --price 定价.xlsx --purchase 进价.xlsx` 不打开网页，
+  把订单目录中每天的订单文字批量生成为 `利润表/YYYY.M.D利润表.xlsx`；
+  不指定定价表/进价表时使用价格历史中各天生效的版本（`--history`）。
 
 原 tkinter 实现已迁移到 `app.py`（Streamlit）。保留此启动脚本以便用户无缝切换。
 """
 
+import argparse
 import os
 import sys
 import shutil
 import subprocess
 
+from price_history import DEFAULT_HISTORY_PATH
 
-def main():
+
+def launch_streamlit():
     # 首先检查 streamlit 是否可用
     if shutil.which("streamlit") is None:
         print("未检测到 streamlit 命令。请先安装依赖：")
@@ -36,5 +42,67 @@ def main():
     os.execvp(cmd[0], cmd)
 
 
+def run_batch_command(args):
+    """批量生成利润表并逐个打印结果；有失败的文件时返回 1"""
+    # 只在批量模式下导入，网页启动不需要加载 pandas
+    from batch_runner import run_batch
+    from price_history import PriceHistory
+
+    if args.price is None and args.history is None or args.purchase is None and args.history is None:
+        print("请用 --price、--purchase 指定定价表和进价表，或用 --history 使用价格历史。")
+        return 1
+    if not os.path.isdir(args.order_dir):
+        print(f"订单文字目录不存在：{args.order_dir}")
+        return 1
+    # 价格历史文件必须已经存在，路径写错时不能新建一个空的历史
+    for label, path in (("定价表", args.price), ("进价表", args.purchase), ("价格历史", args.history)):
+        if path is not None and not os.path.isfile(path):
+            print(f"{label}文件不存在：{path}")
+            return 1
+
+    history = PriceHistory(args.history) if args.history else None
+    results = run_batch(args.order_dir, args.output_dir, price_file=args.price, purchase_file=args.purchase,
+                        history=history, max_workers=args.workers, streaming=args.streaming,
+                        by_unit=args.by_unit)
+
+    failed = skipped = 0
+    for order_path, output_path, result in results:
+        if output_path is None:
+            skipped += 1
+            print(f"- 跳过 {os.path.basename(order_path)}：{result}")
+        elif isinstance(result, tuple):
+            total_profit, rows, unmatched = result
+            note = f"，{unmatched} 个菜品未匹配到价格" if unmatched else ""
+            print(f"✓ {os.path.basename(output_path)}：{rows} 行，总利润 ¥{total_profit:.2f}{note}")
+        else:
+            failed += 1
+            print(f"✗ {os.path.basename(order_path)}：{result}")
+    print(f"\n完成 {len(results) - failed - skipped} 个，失败 {failed} 个，跳过 {skipped} 个，输出目录：{args.output_dir}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="蔬菜公司 Excel 助手；不带参数时启动网页界面")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="批量生成利润表（不打开网页）")
+    batch.add_argument("order_dir", help="订单文字目录，每天一个 .txt 文件，文件名包含日期（如 2025.10.8.txt）")
+    batch.add_argument("-o", "--output-dir", default=os.path.join(repo_dir, "利润表"),
+                       help="利润表输出目录，默认为程序目录下的 利润表/")
+    batch.add_argument("--price", help="定价表文件（Excel、CSV 或 Parquet）")
+    batch.add_argument("--purchase", help="进价表文件（Excel、CSV 或 Parquet）")
+    batch.add_argument("--history", nargs="?", const=DEFAULT_HISTORY_PATH,
+                       help="未指定的定价表/进价表使用价格历史中各天生效的版本，可指定历史文件路径")
+    batch.add_argument("-j", "--workers", type=int, default=None, help="并行进程数，默认与 CPU 核数相同")
+    batch.add_argument("--streaming", action="store_true", help="逐行写入 Excel（几万行的大表）")
+    batch.add_argument("--by-unit", action="store_true", help="按单位分表：汇总表加每个单位一个工作表")
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        sys.exit(run_batch_command(args))
+    launch_streamlit()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+匹配结果缓存模块 - 把"订单菜品名 -> 价格表菜品名"的匹配结果保存到本地 SQLite
+
+缓存按价格表内容指纹（PriceIndex.fingerprint）区分，价格表有任何改动指纹就会变化，
+旧的匹配结果自然失效；命中缓存的菜品不再执行任何匹配规则。
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+# 默认缓存文件，与程序放在同一目录
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'match_cache.sqlite3')
+
+# 最多保留最近使用的价格表指纹数量，更早的自动清理
+DEFAULT_KEEP_TABLES = 20
+
+# SQLite 单条语句的参数个数有限制，分批查询
+_BATCH_SIZE = 500
+
+
+class MatchCache:
+    """
+    菜品匹配结果的本地缓存
+
+    参数:
+        path (str): SQLite 文件路径
+        keep_tables (int): 最多保留的价格表指纹数量
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, keep_tables=DEFAULT_KEEP_TABLES):
+        self.path = path
+        self.keep_tables = keep_tables
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS matches ('
+                ' fingerprint TEXT NOT NULL,'
+                ' rule TEXT NOT NULL,'
+                ' name TEXT NOT NULL,'
+                ' matched TEXT,'
+                ' PRIMARY KEY (fingerprint, rule, name))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS tables ('
+                ' fingerprint TEXT PRIMARY KEY,'
+                ' used_at REAL NOT NULL)'
+            )
+
+    def get_many(self, fingerprint, rule, names):
+        """
+        查询缓存
+
+        参数:
+            fingerprint (str): 价格表指纹
+            rule (str): 匹配规则标识（定价模糊匹配/进价匹配及其参数）
+            names (iterable): 订单菜品名
+
+        返回:
+            dict: 命中的 {订单菜品名: 价格表菜品名}，缓存的"未匹配"结果值为 None
+        """
+        names = list(names)
+        hits = {}
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            for start in range(0, len(names), _BATCH_SIZE):
+                batch = names[start:start + _BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(
+                    f'SELECT name, matched FROM matches'
+                    f' WHERE fingerprint = ? AND rule = ? AND name IN ({placeholders})',
+                    [fingerprint, rule, *batch],
+                )
+                hits.update(rows)
+            if hits:
+                self._touch(conn, fingerprint)
+        return hits
+
+    def put_many(self, fingerprint, rule, resolved):
+        """
+        写入匹配结果
+
+        参数:
+            fingerprint (str): 价格表指纹
+            rule (str): 匹配规则标识
+            resolved (dict): {订单菜品名: 价格表菜品名或 None}
+        """
+        if not resolved:
+            return
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO matches (fingerprint, rule, name, matched) VALUES (?, ?, ?, ?)',
+                [(fingerprint, rule, name, matched) for name, matched in resolved.items()],
+            )
+            self._touch(conn, fingerprint)
+            self._prune(conn)
+
+    def clear(self):
+        """清空全部缓存"""
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute('DELETE FROM matches')
+            conn.execute('DELETE FROM tables')
+
+    def _touch(self, conn, fingerprint):
+        conn.execute(
+            'INSERT OR REPLACE INTO tables (fingerprint, used_at) VALUES (?, ?)',
+            (fingerprint, time.time()),
+        )
+
+    def _prune(self, conn):
+        """只保留最近使用的 keep_tables 个价格表的缓存"""
+        stale = [row[0] for row in conn.execute(
+            'SELECT fingerprint FROM tables ORDER BY used_at DESC LIMIT -1 OFFSET ?',
+            (self.keep_tables,),
+        )]
+        for fingerprint in stale:
+            conn.execute('DELETE FROM matches WHERE fingerprint = ?', (fingerprint,))
+            conn.execute('DELETE FROM tables WHERE fingerprint = ?', (fingerprint,))
@@ -1,38 +1,18 @@
-import difflib
-def fuzzy_find_price(vegetable, price_dict, threshold=0.6):
-    """
-    更强的模糊匹配：
-    1. 先用find_matching_price（原有规则）
-    2. 若找不到，再用包含关系和相似度（Levenshtein/SequenceMatcher）
-    3. threshold为相似度阈值（0~1）
-    """
-    price = find_matching_price(vegetable, price_dict)
-    if price != "000000":
-        return price
-
-    # 包含关系（如“萝卜”能匹配“胡萝卜”）
-    for key, value in price_dict.items():
-        if vegetable in key or key in vegetable:
-            return value
-
-    # Levenshtein/SequenceMatcher相似度
-    best_score = 0
-    best_value = None
-    for key, value in price_dict.items():
-        score = difflib.SequenceMatcher(None, vegetable, key).ratio()
-        if score > best_score:
-            best_score = score
-            best_value = value
-    if best_score >= threshold:
-        return best_value
-    return "000000"
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
 菜品匹配模块 - 汉字完全匹配，编号模糊匹配，自动忽略前缀
 """
 
+import csv
+import hashlib
+import os
 import re
+from collections import OrderedDict
+
+import pandas as pd
+
+from text_index import SimilarityIndex, SubstringIndex
 
 
 def remove_prefix(text):
@@ -115,7 +95,413 @@ def normalize_specification(text):
     return text.strip()
 
 
-def find_matching_price(vegetable, price_dict):
+# 匹配规则版本，修改匹配规则时递增，使已缓存的匹配结果失效
+MATCH_RULES_VERSION = 3
+
+# build_price_index 为普通字典建立的索引最多保留的个数（定价表、进价表交替传入）
+RECENT_INDEX_SIZE = 4
+
+# 默认菜品别名表，与匹配规则说明.txt 放在同一目录
+DEFAULT_ALIAS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '菜品别名表.csv')
+
+
+def clean_name(text):
+    """去除菜品名称中的半角/全角空格"""
+    return text.replace(' ', '').replace('　', '')
+
+
+def load_alias_table(path=DEFAULT_ALIAS_PATH):
+    """
+    读取菜品别名表（CSV）
+
+    每行一组同义词，用逗号分隔；以 # 开头的行为注释。
+
+    参数:
+        path (str): 别名表文件路径
+
+    返回:
+        list: 同义词组列表，如 [['西红柿', '番茄'], ['土豆', '马铃薯', '洋芋']]
+    """
+    groups = []
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for row in csv.reader(f):
+            names = [clean_name(cell.strip()) for cell in row if cell.strip()]
+            if not names or names[0].startswith('#'):
+                continue
+            if len(names) >= 2:
+                groups.append(names)
+    return groups
+
+
+_default_aliases = {'mtime': None, 'groups': []}
+
+# 最近为普通字典建立的索引 {(id, 长度, 内容哈希, 别名): PriceIndex}，按使用先后排列
+_recent_indexes = OrderedDict()
+
+
+def default_alias_groups():
+    """
+    返回默认别名表的同义词组；文件修改后自动重新读取，文件不存在时返回空列表
+    """
+    try:
+        mtime = os.path.getmtime(DEFAULT_ALIAS_PATH)
+    except OSError:
+        return []
+    if _default_aliases['mtime'] != mtime:
+        _default_aliases['groups'] = load_alias_table(DEFAULT_ALIAS_PATH)
+        _default_aliases['mtime'] = mtime
+    return _default_aliases['groups']
+
+
+class PriceIndex:
+    """
+    价格表匹配索引 - 对定价表/进价表预先计算各级匹配所需的标准形式
+
+    每个菜品名只做一次去空格、去前缀、规格标准化、汉字/编号拆分，
+    并为每一级匹配规则建立哈希表。查询时直接查表，
+    不再对整张价格表反复执行正则，返回结果与逐条扫描的规则完全一致。
+
+    参数:
+        price_dict (dict): read_price_excel / read_purchase_price_excel 返回的价格字典
+        aliases (list): 同义词组列表，默认使用菜品别名表.csv
+    """
+
+    def __init__(self, price_dict, aliases=None):
+        # 保存一份快照，避免外部修改字典后索引与内容不一致
+        self.table = dict(price_dict)
+        self.keys = list(self.table)
+        self.aliases = [list(group) for group in (default_alias_groups() if aliases is None else aliases)]
+
+        # 以下列表与 keys 一一对应，在下方整批计算：
+        # _no_prefix 去前缀后的名称，_normalized 去前缀 + 规格标准化后的名称，
+        # _number 去前缀后的编号部分，_number_spec 标准化后的编号部分，
+        # _no_spec 编号部分是否为空（无规格），_cost_no_spec 进价匹配：标准化名称的编号部分是否为空，
+        # _head 去前缀名称的汉字部分，_cost_head 标准化名称的汉字部分
+
+        self._by_no_prefix = {}   # 去前缀名称 -> 第一个序号
+        self._by_normalized = {}  # 标准化名称 -> 第一个序号
+        self._by_head = {}        # 汉字部分 -> [序号, ...]
+        self._by_cost_head = {}   # 标准化名称的汉字部分 -> [序号, ...]
+        self._containment = {}    # 汉字部分包含关系索引，首次使用时再建立
+        self._substrings = None   # 菜品名包含关系索引，首次模糊匹配时再建立
+        self._similarity = None   # 相似度索引，首次模糊匹配时再建立
+        self._fingerprint = None  # 内容指纹，首次使用时再计算
+        self._alias_keys = None   # 标准化别名 -> 匹配到的菜品名，首次使用时再编译
+
+        # 标准形式整批计算，结果与逐个调用 remove_prefix / normalize_specification /
+        # extract_chinese_and_number 一致
+        columns = derive_name_columns(self.keys)
+        no_prefix_parts = _split_head(columns['去前缀'])
+        normalized_parts = _split_head(columns['标准化'])
+        number_spec = _normalize_spec_column(no_prefix_parts['编号']).str.strip()
+
+        self._no_prefix = columns['去前缀'].tolist()
+        self._normalized = columns['标准化'].tolist()
+        self._head = no_prefix_parts['汉字'].tolist()
+        self._cost_head = normalized_parts['汉字'].tolist()
+        self._number = no_prefix_parts['编号'].tolist()
+        self._number_spec = number_spec.tolist()
+        self._no_spec = (no_prefix_parts['编号'].str.strip() == '').tolist()
+        self._cost_no_spec = (normalized_parts['编号'].str.strip() == '').tolist()
+
+        for i, (key_no_prefix, key_normalized, key_chinese, cost_chinese) in enumerate(
+                zip(self._no_prefix, self._normalized, self._head, self._cost_head)):
+            self._by_no_prefix.setdefault(key_no_prefix, i)
+            self._by_normalized.setdefault(key_normalized, i)
+            if key_chinese:
+                self._by_head.setdefault(key_chinese, []).append(i)
+            if cost_chinese:
+                self._by_cost_head.setdefault(cost_chinese, []).append(i)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.table
+
+    def __getitem__(self, key):
+        return self.table[key]
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def items(self):
+        return self.table.items()
+
+    @property
+    def fingerprint(self):
+        """价格表内容指纹（按顺序对菜品名、价格和别名表做 SHA-256），任何一项变化时随之改变"""
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            for key, value in self.table.items():
+                digest.update(f'{key}\t{value!r}\n'.encode('utf-8'))
+            for group in self.aliases:
+                digest.update(('=' + ','.join(group) + '\n').encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def price_of(self, key):
+        """根据匹配到的菜品名返回价格，未匹配时返回 "000000" """
+        if key is None:
+            return "000000"
+        return self.table[key]
+
+    def _first_containing_head(self, view, veg_chinese):
+        """
+        汉字部分包含关系匹配（如"白菜"匹配"大白菜"），两者汉字长度都需 >= 2
+
+        参数:
+            view (str): 'head' 使用去前缀名称的汉字部分，'cost' 使用标准化名称的汉字部分
+            veg_chinese (str): 订单菜品的汉字部分
+
+        返回:
+            tuple: (无规格候选序号, 有规格候选序号)，各自取最靠前的一个，没有则为 None
+        """
+        if len(veg_chinese) < 2:
+            return None, None
+        indexes = self._containment.get(view)
+        if indexes is None:
+            if view == 'head':
+                heads, no_spec = self._head, self._no_spec
+            else:
+                heads, no_spec = self._cost_head, self._cost_no_spec
+            indexes = (
+                SubstringIndex([h if flag else None for h, flag in zip(heads, no_spec)]),
+                SubstringIndex([h if not flag else None for h, flag in zip(heads, no_spec)]),
+            )
+            self._containment[view] = indexes
+
+        result = []
+        for index in indexes:
+            ranks = [
+                index.first_containing(veg_chinese, exclude_self=True),
+                index.first_contained_in(veg_chinese, min_length=2, exclude_self=True),
+            ]
+            ranks = [rank for rank in ranks if rank is not None]
+            result.append(min(ranks) if ranks else None)
+        return tuple(result)
+
+    def _head_candidates(self, veg_chinese, veg_number):
+        """
+        汉字+编号匹配的候选（find_matching_price 第4~6级），返回 [(匹配度, 序号), ...]
+        """
+        indices = self._by_head.get(veg_chinese)
+        if indices:
+            # 汉字部分完全一致：按编号匹配度打分
+            veg_spec_normalized = normalize_specification(veg_number)
+            candidates = []
+            for i in indices:
+                key_number = self._number[i]
+                key_spec_normalized = self._number_spec[i]
+                if veg_spec_normalized == key_spec_normalized:
+                    # 完全匹配（汉字+编号都一致），不可能有更高的候选
+                    return [(4, i)]
+                elif veg_number == key_number:
+                    # 原始编号完全匹配
+                    candidates.append((3, i))
+                elif veg_number and key_number and (
+                        veg_number in key_number or key_number in veg_number or
+                        veg_spec_normalized in key_spec_normalized or
+                        key_spec_normalized in veg_spec_normalized):
+                    # 编号部分包含匹配
+                    candidates.append((2, i))
+                else:
+                    # 仅汉字匹配
+                    candidates.append((1, i))
+            return candidates
+
+        # 汉字部分包含关系匹配，优先选择没有规格的菜品（更通用）
+        no_spec, spec = self._first_containing_head('head', veg_chinese)
+        candidates = []
+        if no_spec is not None:
+            candidates.append((0.5, no_spec))
+        if spec is not None:
+            candidates.append((0.3, spec))
+        return candidates
+
+    def _cost_head_candidates(self, veg_chinese):
+        """
+        进价汉字部分匹配的候选（忽略规格），返回 [(匹配度, 序号), ...]
+
+        优先级：汉字一致+无规格 > 包含匹配+无规格 > 汉字一致+有规格 > 包含匹配+有规格
+        """
+        candidates = []
+        found_spec = False
+        for i in self._by_cost_head.get(veg_chinese, ()):
+            if self._cost_no_spec[i]:
+                candidates.append((2, i))
+                break
+            if not found_spec:
+                candidates.append((1, i))
+                found_spec = True
+
+        no_spec, spec = self._first_containing_head('cost', veg_chinese)
+        if no_spec is not None:
+            candidates.append((1.5, no_spec))
+        if spec is not None:
+            candidates.append((0.5, spec))
+        return candidates
+
+    def _exact_key(self, vegetable):
+        """
+        前三级精确匹配（完全一致、去前缀、规格标准化）
+
+        返回:
+            tuple: (匹配到的菜品名或 None, 去前缀名称, 标准化名称)
+        """
+        # 去除空格
+        vegetable_clean = clean_name(vegetable)
+
+        # 1. 精确匹配（完全一致，包括前缀）
+        if vegetable_clean in self.table:
+            return vegetable_clean, None, None
+
+        # 2. 去除前缀后再尝试完全匹配
+        vegetable_no_prefix = remove_prefix(vegetable_clean)
+        i = self._by_no_prefix.get(vegetable_no_prefix)
+        if i is not None:
+            return self.keys[i], vegetable_no_prefix, None
+
+        # 3. 标准化规格信息后再尝试匹配
+        vegetable_normalized = normalize_specification(vegetable_no_prefix)
+        i = self._by_normalized.get(vegetable_normalized)
+        if i is not None:
+            return self.keys[i], vegetable_no_prefix, vegetable_normalized
+        return None, vegetable_no_prefix, vegetable_normalized
+
+    def _alias_targets(self):
+        """
+        把别名表编译成 {标准化别名: 菜品名}：每个名称按同组其他名称依次在本表中精确匹配
+        （完全一致、去前缀或规格标准化后一致），取第一个能匹配到的结果
+        """
+        if self._alias_keys is None:
+            targets = {}
+            for group in self.aliases:
+                for name in group:
+                    form = normalize_specification(remove_prefix(clean_name(name)))
+                    if form in targets:
+                        continue
+                    for synonym in group:
+                        if synonym == name:
+                            continue
+                        key = self._exact_key(synonym)[0]
+                        if key is not None:
+                            targets[form] = key
+                            break
+            self._alias_keys = targets
+        return self._alias_keys
+
+    def _resolve(self, vegetable, cost):
+        """
+        对订单菜品名只计算一次各种标准形式，逐级查表；
+        汉字级别的规则把所有候选按 (规则组, 匹配度) 打分后取最高且最靠前的一个。
+        cost 为 True 时追加进价表的汉字部分匹配规则（规则组低于定价规则）。
+        """
+        # 1~3. 完全一致、去前缀、规格标准化
+        key, vegetable_no_prefix, vegetable_normalized = self._exact_key(vegetable)
+        if key is not None:
+            return key
+
+        veg_chinese, veg_number = extract_chinese_and_number(vegetable_no_prefix)
+        cost_chinese = extract_chinese_and_number(vegetable_normalized)[0] if cost else ''
+
+        # 别名表：表中没有与订单汉字部分完全一致的菜品时，先按已知同义词精确查表，
+        # 优先于包含关系匹配（订单"番茄"匹配"西红柿"，而不是"番茄酱"）；
+        # 有汉字一致的菜品时（如订单"尖椒"、表中"尖椒1号"）仍按订单自己的名称匹配
+        if self.aliases and veg_chinese not in self._by_head and cost_chinese not in self._by_cost_head:
+            key = self._alias_targets().get(vegetable_normalized)
+            if key is not None:
+                return key
+
+        # 4. 汉字+编号匹配（去除前缀后），没有汉字则跳过
+        candidates = []
+        if veg_chinese:
+            candidates = [((1, score), i) for score, i in self._head_candidates(veg_chinese, veg_number)]
+
+        # 5. 进价：汉字部分匹配（忽略规格），仅在以上规则都没有候选时才可能胜出
+        if cost and not candidates and cost_chinese:
+            candidates = [((0, score), i) for score, i in self._cost_head_candidates(cost_chinese)]
+
+        if not candidates:
+            # 找不到匹配
+            return None
+        _, best_index = max(candidates, key=lambda c: (c[0], -c[1]))
+        return self.keys[best_index]
+
+    def match_key(self, vegetable):
+        """
+        按 find_matching_price 的规则查找，返回匹配到的菜品名，找不到返回 None
+        """
+        return self._resolve(vegetable, cost=False)
+
+    def match_cost_key(self, vegetable):
+        """
+        按 find_matching_cost_price 的规则查找，返回匹配到的菜品名，找不到返回 None
+        """
+        return self._resolve(vegetable, cost=True)
+
+    def fuzzy_key(self, vegetable, threshold=0.6):
+        """
+        按 fuzzy_find_price 的规则查找，返回匹配到的菜品名，找不到返回 None
+        """
+        key = self.match_key(vegetable)
+        if key is not None:
+            return key
+
+        # 包含关系（如“萝卜”能匹配“胡萝卜”）
+        if self._substrings is None:
+            self._substrings = SubstringIndex(self.keys)
+        ranks = [
+            self._substrings.first_containing(vegetable),
+            self._substrings.first_contained_in(vegetable),
+        ]
+        ranks = [rank for rank in ranks if rank is not None]
+        if ranks:
+            return self.keys[min(ranks)]
+
+        # SequenceMatcher相似度，只对有共同字符的候选计算
+        if self._similarity is None:
+            self._similarity = SimilarityIndex(self.keys)
+        best = self._similarity.best_match(vegetable, threshold)
+        if best is not None:
+            return self.keys[best[0]]
+        return None
+
+
+def build_price_index(price_dict, aliases=None):
+    """
+    为价格字典建立匹配索引；已经是 PriceIndex 时直接返回，最近传入过的同一字典（内容未变）复用已建立的索引
+
+    参数:
+        price_dict (dict or PriceIndex): 价格字典
+        aliases (list): 同义词组列表，默认使用菜品别名表.csv
+
+    返回:
+        PriceIndex: 匹配索引
+    """
+    if isinstance(price_dict, PriceIndex):
+        return price_dict
+    groups = default_alias_groups() if aliases is None else aliases
+    try:
+        key = (id(price_dict), len(price_dict), hash(tuple(price_dict.items())),
+               tuple(tuple(group) for group in groups))
+    except TypeError:  # 价格不可哈希时不缓存
+        return PriceIndex(price_dict, groups)
+
+    # 逐个菜品调用 find_matching_* 时传入的是同一个字典，最近建立的索引直接复用；
+    # 字典内容改变后哈希不同，重新建立
+    index = _recent_indexes.get(key)
+    if index is None:
+        index = PriceIndex(price_dict, groups)
+        _recent_indexes[key] = index
+        if len(_recent_indexes) > RECENT_INDEX_SIZE:
+            _recent_indexes.popitem(last=False)
+    else:
+        _recent_indexes.move_to_end(key)
+    return index
+
+
+def find_matching_price(vegetable, price_dict, aliases=None):
     """
     查找菜品价格 - 汉字完全匹配，编号模糊匹配，自动忽略前缀，支持规格匹配
     
@@ -125,101 +511,24 @@ def find_matching_price(vegetable, price_dict):
     3. 汉字部分必须完全一致
     4. 编号部分可以模糊匹配或不匹配
     5. 支持规格匹配（"大白菜一级品" 可匹配 "大白菜(一级品)"）
-    6. 优先级：完全匹配 > 去前缀完全匹配 > 汉字+编号匹配 > 仅汉字匹配
+    6. 支持别名表（"番茄" 可匹配 "西红柿"，见 菜品别名表.csv）
+    7. 优先级：完全匹配 > 去前缀完全匹配 > 汉字+编号匹配 > 仅汉字匹配 > 别名匹配 > 汉字包含匹配
+    
+    批量查询时请先用 build_price_index 建立索引并传入，避免每次重建。
     
     参数:
         vegetable (str): 菜品名称
-        price_dict (dict): 价格字典
+        price_dict (dict or PriceIndex): 价格字典或其匹配索引
+        aliases (list): 同义词组列表，仅 price_dict 为字典时使用，默认使用菜品别名表.csv
     
     返回:
         float or str: 价格或"000000"
     """
-    # 去除空格
-    vegetable_clean = vegetable.replace(' ', '').replace('　', '')
-    
-    # 1. 精确匹配（完全一致，包括前缀）
-    if vegetable_clean in price_dict:
-        return price_dict[vegetable_clean]
-    
-    # 2. 去除前缀后再尝试完全匹配
-    vegetable_no_prefix = remove_prefix(vegetable_clean)
-    for key, value in price_dict.items():
-        key_no_prefix = remove_prefix(key.replace(' ', '').replace('　', ''))
-        if vegetable_no_prefix == key_no_prefix:
-            return value
-    
-    # 3. 标准化规格信息后再尝试匹配
-    veg_normalized = normalize_specification(vegetable_no_prefix)
-    for key, value in price_dict.items():
-        key_no_prefix = remove_prefix(key.replace(' ', '').replace('　', ''))
-        key_normalized = normalize_specification(key_no_prefix)
-        if veg_normalized == key_normalized:
-            return value
-    
-    # 4. 提取订单菜品的汉字和编号（去除前缀后）
-    veg_chinese, veg_number = extract_chinese_and_number(vegetable_no_prefix)
-    
-    if not veg_chinese:
-        # 如果没有汉字，无法匹配
-        return "000000"
-    
-    # 5. 汉字+编号匹配（忽略前缀）
-    candidates = []
-    
-    for key, value in price_dict.items():
-        key_clean = key.replace(' ', '').replace('　', '')
-        key_no_prefix = remove_prefix(key_clean)
-        key_chinese, key_number = extract_chinese_and_number(key_no_prefix)
-        
-        # 汉字部分必须完全一致
-        if veg_chinese == key_chinese:
-            # 标准化规格信息进行匹配
-            veg_spec_normalized = normalize_specification(veg_number)
-            key_spec_normalized = normalize_specification(key_number)
-            
-            # 计算编号匹配度
-            if veg_spec_normalized == key_spec_normalized:
-                # 完全匹配（汉字+编号都一致，包括都为空的情况）
-                candidates.append((4, value))
-            elif veg_number == key_number:
-                # 原始编号完全匹配
-                candidates.append((3, value))
-            elif veg_number and key_number:
-                # 两者都有编号，检查包含关系
-                if (veg_number in key_number or key_number in veg_number or 
-                    veg_spec_normalized in key_spec_normalized or 
-                    key_spec_normalized in veg_spec_normalized):
-                    # 编号部分包含匹配
-                    candidates.append((2, value))
-                else:
-                    # 汉字匹配但编号不匹配
-                    candidates.append((1, value))
-            else:
-                # 一方有编号一方没有，或都没有编号
-                # 仅汉字匹配
-                candidates.append((1, value))
-        
-        # 汉字部分包含关系匹配（如"白菜"匹配"大白菜"）
-        elif (veg_chinese != key_chinese and 
-              (veg_chinese in key_chinese or key_chinese in veg_chinese) and
-              len(veg_chinese) >= 2 and len(key_chinese) >= 2):
-            # 优先选择没有规格的菜品（更通用）
-            if not key_number or key_number.strip() == '':
-                candidates.append((0.5, value))  # 低优先级：包含匹配+无规格
-            else:
-                candidates.append((0.3, value))  # 更低优先级：包含匹配+有规格
-    
-    # 如果有候选，返回匹配度最高的
-    if candidates:
-        # 按匹配度排序，取最高的
-        candidates.sort(key=lambda x: x[0], reverse=True)
-        return candidates[0][1]
-    
-    # 找不到匹配
-    return "000000"
+    index = build_price_index(price_dict, aliases)
+    return index.price_of(index.match_key(vegetable))
 
 
-def find_matching_cost_price(vegetable, cost_dict):
+def find_matching_cost_price(vegetable, cost_dict, aliases=None):
     """
     查找菜品进价 - 优先精确匹配，其次汉字部分匹配（忽略规格）
     
@@ -230,60 +539,126 @@ def find_matching_cost_price(vegetable, cost_dict):
     
     参数:
         vegetable (str): 菜品名称
-        cost_dict (dict): 进价字典 {菜品名: 进价}
+        cost_dict (dict or PriceIndex): 进价字典 {菜品名: 进价} 或其匹配索引
+        aliases (list): 同义词组列表，仅 cost_dict 为字典时使用，默认使用菜品别名表.csv
     
     返回:
         float or str: 进价或"000000"
     """
-    # 去除空格
-    vegetable_clean = vegetable.replace(' ', '').replace('　', '')
-    
-    # 1. 先尝试使用原有的精确匹配逻辑
-    price = find_matching_price(vegetable, cost_dict)
-    if price != "000000":
-        return price
-    
-    # 2. 如果精确匹配失败，尝试汉字部分匹配（忽略规格）
-    vegetable_no_prefix = remove_prefix(vegetable_clean)
-    vegetable_normalized = normalize_specification(vegetable_no_prefix)
-    veg_chinese, _ = extract_chinese_and_number(vegetable_normalized)
-    
-    if not veg_chinese:
-        return "000000"
-    
-    # 3. 在进价表中查找汉字部分匹配的菜品
-    candidates = []
-    for key, value in cost_dict.items():
-        key_clean = key.replace(' ', '').replace('　', '')
-        key_no_prefix = remove_prefix(key_clean)
-        key_normalized = normalize_specification(key_no_prefix)
-        key_chinese, key_number = extract_chinese_and_number(key_normalized)
-        
-        # 汉字部分完全一致
-        if veg_chinese == key_chinese:
-            # 优先选择没有规格的菜品（更通用）
-            if not key_number or key_number.strip() == '':
-                candidates.append((2, value))  # 高优先级：无规格
-            else:
-                candidates.append((1, value))  # 低优先级：有规格
-        
-        # 汉字部分包含关系匹配（如"大白菜"匹配"白菜"）
-        elif (veg_chinese != key_chinese and 
-              (veg_chinese in key_chinese or key_chinese in veg_chinese) and
-              len(veg_chinese) >= 2 and len(key_chinese) >= 2):
-            # 优先选择没有规格的菜品（更通用）
-            if not key_number or key_number.strip() == '':
-                candidates.append((1.5, value))  # 中等优先级：包含匹配+无规格
-            else:
-                candidates.append((0.5, value))  # 低优先级：包含匹配+有规格
-    
-    # 如果有候选，返回优先级最高的
-    if candidates:
-        candidates.sort(key=lambda x: x[0], reverse=True)
-        return candidates[0][1]
-    
-    # 找不到匹配
-    return "000000"
+    index = build_price_index(cost_dict, aliases)
+    return index.price_of(index.match_cost_key(vegetable))
+
+
+def fuzzy_find_price(vegetable, price_dict, threshold=0.6, aliases=None):
+    """
+    更强的模糊匹配：
+    1. 先用find_matching_price（原有规则）
+    2. 若找不到，再用包含关系和相似度（Levenshtein/SequenceMatcher）
+    3. threshold为相似度阈值（0~1）
+    4. aliases 为同义词组列表，仅 price_dict 为字典时使用
+    """
+    index = build_price_index(price_dict, aliases)
+    return index.price_of(index.fuzzy_key(vegetable, threshold))
+
+
+def derive_name_columns(names):
+    """
+    整批计算菜品名的标准形式，结果与逐个调用
+    clean_name / remove_prefix / normalize_specification 一致
+
+    参数:
+        names (iterable): 菜品名称序列
+
+    返回:
+        DataFrame: 列为 菜品、去空格、去前缀、标准化
+    """
+    frame = pd.DataFrame({'菜品': pd.Series(list(names), dtype=object)})
+    cleaned = frame['菜品'].str.replace(' ', '', regex=False).str.replace('　', '', regex=False)
+    no_prefix = (
+        cleaned.str.replace(r'^\[[^\]]+\]\s*', '', regex=True)
+        .str.replace(r'^[A-Z]{2,3}-', '', regex=True, flags=re.IGNORECASE)
+        .str.strip()
+    )
+    frame['去空格'] = cleaned
+    frame['去前缀'] = no_prefix
+    frame['标准化'] = _normalize_spec_column(no_prefix).str.strip()
+    return frame
+
+
+def _normalize_spec_column(series):
+    """整列规格标准化（不含去除首尾空白），规则同 normalize_specification：已带括号开头或结尾的不处理"""
+    bracketed = series.str.startswith('(') | series.str.endswith(')')
+    normalized = (
+        series.str.replace('一级品', '(一级品)', regex=False)
+        .str.replace('二级品', '(二级品)', regex=False)
+        .str.replace('三级品', '(三级品)', regex=False)
+        .str.replace(r'(特级|优级|普通)', r'(\1)', regex=True)
+    )
+    return normalized.where(~bracketed, series)
+
+
+def _split_head(series):
+    """整列拆分汉字部分和编号部分，规则同 extract_chinese_and_number；返回列为 汉字、编号 的 DataFrame"""
+    return series.str.extract(r'^([\u4e00-\u9fff]*)(.*)$', flags=re.DOTALL).set_axis(['汉字', '编号'], axis=1)
+
+
+def _resolve_names(index, names, rule, resolve, cache):
+    """
+    对去重后的菜品名逐个求匹配结果：先查缓存，缓存中没有的再逐个执行 resolve
+
+    返回:
+        dict: {订单菜品名: 价格表菜品名或 None}
+    """
+    keys = cache.get_many(index.fingerprint, rule, names) if cache is not None else {}
+    resolved = {name: resolve(name) for name in names if name not in keys}
+
+    if cache is not None:
+        cache.put_many(index.fingerprint, rule, resolved)
+    keys.update(resolved)
+    return keys
+
+
+def match_many(names, price_table, purchase_table, threshold=0.6, cache=None, memo=None):
+    """
+    批量匹配定价和进价 - 相同菜品名只匹配一次
+
+    每天的订单里同一批菜品会在几十个单位中重复出现，
+    这里先对菜品名去重，每个不同的菜品名分别在定价表（fuzzy_find_price 规则）
+    和进价表（find_matching_cost_price 规则）中匹配一次，再按原顺序展开。
+    匹配规则会用到原始菜品名（包含关系、相似度），所以只合并完全相同的名称。
+    传入 cache（match_cache.MatchCache）时，先按价格表指纹查本地缓存，
+    命中的菜品跳过全部匹配规则，新的匹配结果写回缓存。
+    分批处理大量订单时传入同一个 memo 字典，之前批次匹配过的菜品名不再重复匹配。
+
+    参数:
+        names (iterable): 菜品名称序列
+        price_table (dict or PriceIndex): 定价表或其匹配索引
+        purchase_table (dict or PriceIndex): 进价表或其匹配索引
+        threshold (float): 定价模糊匹配的相似度阈值
+        cache (MatchCache): 匹配结果缓存，可选
+        memo (dict): {订单菜品名: (定价, 进价)}，跨批次复用的匹配结果，可选；
+                     只能在同一对定价表、进价表之间共用
+
+    返回:
+        list: 与 names 一一对应的 (定价, 进价) 列表，找不到的价格为"000000"
+    """
+    price_index = build_price_index(price_table)
+    purchase_index = build_price_index(purchase_table)
+
+    names = list(names)
+    resolved = {} if memo is None else memo
+    distinct = [name for name in dict.fromkeys(names) if name not in resolved]
+
+    price_keys = _resolve_names(
+        price_index, distinct, f'v{MATCH_RULES_VERSION}:fuzzy:{threshold!r}',
+        lambda name: price_index.fuzzy_key(name, threshold), cache)
+    purchase_keys = _resolve_names(
+        purchase_index, distinct, f'v{MATCH_RULES_VERSION}:cost',
+        purchase_index.match_cost_key, cache)
+
+    for name in distinct:
+        resolved[name] = (price_index.price_of(price_keys[name]), purchase_index.price_of(purchase_keys[name]))
+    return [resolved[name] for name in names]
 
 
 if __name__ == "__main__":
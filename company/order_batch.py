@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单批次模块 - 按列保存订单，代替 {单位, 菜品, 数量} 字典列表
+
+单位名、菜品名各只保存一份，订单行只记录它们的编号和数量：
+每行约 16 字节，而一个订单字典要几百字节。
+匹配价格时按不同菜品各算一次，再按编号整列展开。
+"""
+
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from parser import iter_orders, orders_from_tokens, tokenize_line
+
+# 订单没有单位时使用的单位名
+DEFAULT_UNIT = '未指定单位'
+
+
+class OrderBatch:
+    """
+    一批订单（列式存储）
+
+    参数:
+        units (list): 不同的单位名，unit_codes 是其下标
+        dishes (list): 不同的菜品名，dish_codes 是其下标
+        unit_codes (array-like): 每行订单的单位编号
+        dish_codes (array-like): 每行订单的菜品编号
+        quantities (array-like): 每行订单的数量
+    """
+
+    def __init__(self, units, dishes, unit_codes, dish_codes, quantities):
+        self.units = list(units)
+        self.dishes = list(dishes)
+        self.unit_codes = np.asarray(unit_codes, dtype=np.int32)
+        self.dish_codes = np.asarray(dish_codes, dtype=np.int32)
+        self.quantities = np.asarray(quantities, dtype=float)
+
+    @classmethod
+    def from_orders(cls, orders):
+        """
+        由订单字典建立批次，可以是列表或逐条产出的迭代器（不会先展开成列表）
+
+        没有菜品的订单跳过，没有单位的记为"未指定单位"，没有数量的记为 0，
+        与 calculate_profit_and_generate_excel 的校验规则相同。
+
+        参数:
+            orders (iterable): 订单字典，每项包含 {单位, 菜品, 数量}
+
+        返回:
+            OrderBatch: 订单批次
+        """
+        if isinstance(orders, OrderBatch):
+            return orders
+        unit_index = {}
+        dish_index = {}
+        unit_codes = array('i')
+        dish_codes = array('i')
+        quantities = array('d')
+        for order in orders:
+            if '菜品' not in order:
+                continue
+            unit_codes.append(unit_index.setdefault(order.get('单位', DEFAULT_UNIT), len(unit_index)))
+            dish_codes.append(dish_index.setdefault(order['菜品'], len(dish_index)))
+            quantities.append(order.get('数量', 0))
+        return cls(list(unit_index), list(dish_index), unit_codes, dish_codes, quantities)
+
+    @classmethod
+    def from_text(cls, source):
+        """
+        直接从文字列表解析出订单批次
+
+        参数:
+            source: 原始文字列表（字符串）、文件对象或逐行产出字符串的迭代器
+
+        返回:
+            OrderBatch: 订单批次
+        """
+        return cls.from_orders(iter_orders(source))
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def __iter__(self):
+        """逐条产出订单字典，兼容原来的字典列表用法"""
+        for unit_code, dish_code, quantity in zip(self.unit_codes.tolist(), self.dish_codes.tolist(),
+                                                  self.quantities.tolist()):
+            yield {'单位': self.units[unit_code], '菜品': self.dishes[dish_code], '数量': quantity}
+
+    def to_orders(self):
+        """转换为订单字典列表"""
+        return list(self)
+
+    def unit_column(self):
+        """每行订单的单位名"""
+        return np.asarray(self.units, dtype=object)[self.unit_codes]
+
+    def dish_column(self):
+        """每行订单的菜品名"""
+        return np.asarray(self.dishes, dtype=object)[self.dish_codes]
+
+    def to_frame(self):
+        """
+        转换为 DataFrame（单位、菜品为分类列，不复制名称）
+
+        返回:
+            DataFrame: 列为 单位、菜品、数量
+        """
+        return pd.DataFrame({
+            '单位': pd.Categorical.from_codes(self.unit_codes, categories=pd.Index(self.units, dtype=object)),
+            '菜品': pd.Categorical.from_codes(self.dish_codes, categories=pd.Index(self.dishes, dtype=object)),
+            '数量': self.quantities,
+        })
+
+
+class IncrementalOrderParser:
+    """
+    增量解析文字列表：每次只解析上次没有出现过的行
+
+    每行的解析结果与所属单位无关，按行文字缓存；单位归属在组装订单时按行顺序重新计算，
+    所以修改、插入、删除任意行（包括单位行）后结果都与重新整体解析相同。
+    缓存只保留最近一次文字中的行，不会随编辑次数增长。
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self.last_parsed_lines = 0  # 最近一次实际解析的行数
+
+    def parse(self, text):
+        """
+        解析文字列表
+
+        参数:
+            text (str): 原始文字列表
+
+        返回:
+            OrderBatch: 订单批次
+        """
+        previous = self._tokens
+        tokens = {}
+        parsed = 0
+        line_tokens = []
+        for line in text.split('\n'):
+            token = tokens.get(line)
+            if token is None:
+                token = previous.get(line)
+                if token is None:
+                    token = tokenize_line(line)
+                    parsed += 1
+                tokens[line] = token
+            line_tokens.append(token)
+
+        self._tokens = tokens
+        self.last_parsed_lines = parsed
+        return OrderBatch.from_orders(orders_from_tokens(line_tokens))
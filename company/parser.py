@@ -6,6 +6,117 @@
 
 import re
 
+# 菜品 + 数字 + 斤；一行可以有多组，如"胡萝卜20斤 尖椒20斤 黄瓜10斤"
+ITEM_PATTERN = re.compile(r'(.*?)(\d+(?:\.\d+)?)\s*斤')
+
+# 菜品名两端的空白（含不换行空格等 Unicode 空白）和同一行多个菜品之间常见的分隔符
+ITEM_TRIM_PATTERN = re.compile(r'^[\s，,、;；/|]+|[\s，,、;；/|]+$')
+
+
+def _iter_lines(source):
+    """
+    逐行取出文本
+
+    参数:
+        source: 字符串（按换行符分行，不整体复制）、文件对象或任意逐行产出字符串的迭代器；
+                bytes 行按 UTF-8 解码
+    """
+    if isinstance(source, str):
+        start = 0
+        while True:
+            end = source.find('\n', start)
+            if end == -1:
+                yield source[start:]
+                return
+            yield source[start:end]
+            start = end + 1
+    for line in source:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        yield line
+
+
+# tokenize_line 返回的行类型
+LINE_EMPTY = 'empty'   # 空行
+LINE_UNIT = 'unit'     # 单位名称
+LINE_ITEMS = 'items'   # 菜品行
+
+
+def tokenize_line(line):
+    """
+    解析一行文字，结果只取决于这一行本身（不依赖所属单位），可以按行缓存
+
+    参数:
+        line (str): 一行文字
+
+    返回:
+        tuple: (LINE_EMPTY, None)、(LINE_UNIT, 单位名) 或 (LINE_ITEMS, ((菜品, 数量), ...))；
+               只有数量没有菜品名的行为 (LINE_ITEMS, ())
+    """
+    line = line.strip()
+    
+    # 忽略空行
+    if not line:
+        return LINE_EMPTY, None
+    
+    # 不含"斤"的行一定是单位名称，无需正则
+    if '斤' not in line:
+        return LINE_UNIT, line
+    
+    # 一次扫描取出行内所有"菜品+数字+斤"
+    has_quantity = False
+    items = []
+    for match in ITEM_PATTERN.finditer(line):
+        has_quantity = True
+        vegetable = ITEM_TRIM_PATTERN.sub('', match.group(1))
+        if vegetable:  # 只有数量没有菜品名的跳过
+            items.append((vegetable, float(match.group(2))))
+    
+    # 不包含"数字+斤"的行是单位名称
+    if not has_quantity:
+        return LINE_UNIT, line
+    return LINE_ITEMS, tuple(items)
+
+
+def orders_from_tokens(tokens):
+    """
+    把逐行解析结果组装为订单：菜品行归入前面最近的单位，没有单位时为"未指定单位"
+
+    参数:
+        tokens (iterable): tokenize_line 的结果
+
+    返回:
+        generator: 依次产出 {单位, 菜品, 数量}
+    """
+    current_unit = "未指定单位"  # 默认单位
+    for kind, value in tokens:
+        if kind == LINE_UNIT:
+            current_unit = value
+        elif kind == LINE_ITEMS:
+            # 无论是否有单位，都添加订单（使用默认单位或当前单位）
+            for vegetable, quantity in value:
+                yield {
+                    '单位': current_unit,
+                    '菜品': vegetable,
+                    '数量': quantity
+                }
+
+
+def iter_orders(source):
+    """
+    逐行解析订单，边读边产出，不把整份文本和订单列表同时放在内存里
+
+    含"数字+斤"的行是菜品行，一行可以有多个菜品（如"胡萝卜20斤 尖椒20斤"），
+    其余非空行是单位名称，之后的菜品都归入该单位。
+
+    参数:
+        source: 原始文字列表（字符串）、文件对象或逐行产出字符串的迭代器
+
+    返回:
+        generator: 依次产出 {单位, 菜品, 数量}
+    """
+    return orders_from_tokens(tokenize_line(line) for line in _iter_lines(source))
+
 
 def parse_text_list(text):
     """
@@ -17,40 +128,7 @@ def parse_text_list(text):
     返回:
         list: 解析后的订单列表，每项包含 {单位, 菜品, 数量}
     """
-    orders = []
-    lines = text.strip().split('\n')
-    
-    current_unit = "未指定单位"  # 默认单位
-    
-    for line in lines:
-        line = line.strip()
-        
-        # 忽略空行
-        if not line:
-            continue
-        
-        # 尝试匹配菜品和数量的模式
-        # 格式：菜品名 + 数字 + 斤
-        match = re.search(r'(.+?)(\d+(?:\.\d+)?)\s*斤', line)
-        
-        if match:
-            # 这是菜品行
-            vegetable = match.group(1).strip()
-            quantity = float(match.group(2))
-            
-            # 无论是否有单位，都添加订单（使用默认单位或当前单位）
-            orders.append({
-                '单位': current_unit,
-                '菜品': vegetable,
-                '数量': quantity
-            })
-        else:
-            # 这可能是单位名称
-            # 如果行中不包含数字和"斤"，则认为是单位名称
-            if not re.search(r'\d+(?:\.\d+)?\s*斤', line):
-                current_unit = line
-    
-    return orders
+    return list(iter_orders(text))
 
 
 if __name__ == "__main__":
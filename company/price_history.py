@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+价格历史模块 - 按日期保存定价表/进价表的每个版本，只记录变化的菜品
+
+每天上传的整张表与前一个版本比较，只写入新增、改价、删除（以及顺序变化）的菜品；
+任意日期的价格表都可以直接从历史中还原，无需重新上传当天的 Excel。
+
+表格顺序会影响匹配结果（同分时取靠前的菜品），所以每条记录还保存菜品在表中的位置：
+位置是可以插入中间值的小数，新菜品插在前后两个菜品之间，其余菜品的位置不变、无需重写。
+"""
+
+import datetime
+import math
+import os
+import sqlite3
+import time
+from bisect import bisect_left
+from contextlib import closing
+
+# 默认历史文件，与程序放在同一目录
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_history.sqlite3')
+
+# 两个菜品之间的位置间隔小于此值时，当天的版本改为写入全部菜品并重新编号
+MIN_POSITION_GAP = 1e-6
+
+
+def _date_key(date):
+    """日期统一转为 'YYYY-MM-DD' 字符串（接受 date、datetime 或同格式的字符串）"""
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    if isinstance(date, datetime.date):
+        return date.isoformat()
+    return datetime.date.fromisoformat(str(date)).isoformat()
+
+
+def _same_price(a, b):
+    """比较两个价格，两个都是 NaN（价格为空）视为相同"""
+    return a == b or (math.isnan(a) and math.isnan(b))
+
+
+def _longest_increasing(positions):
+    """
+    最长递增子序列
+
+    参数:
+        positions (list): 数值列表
+
+    返回:
+        set: 属于该子序列的下标
+    """
+    tails = []
+    tail_indexes = []
+    previous = [-1] * len(positions)
+    for i, position in enumerate(positions):
+        j = bisect_left(tails, position)
+        if j == len(tails):
+            tails.append(position)
+            tail_indexes.append(i)
+        else:
+            tails[j] = position
+            tail_indexes[j] = i
+        previous[i] = tail_indexes[j - 1] if j else -1
+
+    result = set()
+    i = tail_indexes[-1] if tail_indexes else -1
+    while i != -1:
+        result.add(i)
+        i = previous[i]
+    return result
+
+
+def _assign_positions(names, old_positions):
+    """
+    为新版本的菜品分配位置，尽量沿用旧位置
+
+    按新顺序取旧位置的最长递增子序列，这些菜品位置不变；
+    其余菜品（新增或被挪动的）均匀插入前后两个不变菜品之间。
+
+    参数:
+        names (list): 新版本的菜品名（按表中顺序）
+        old_positions (dict): 上一版本 {菜品名: 位置}
+
+    返回:
+        list or None: 与 names 对应的位置；间隔过小需要重新编号时返回 None
+    """
+    kept = [i for i, name in enumerate(names) if name in old_positions]
+    anchors = {kept[i] for i in _longest_increasing([old_positions[names[i]] for i in kept])}
+
+    positions = [None] * len(names)
+    previous_anchor = None
+    pending = []
+    for i in list(range(len(names))) + [None]:
+        if i is not None and i not in anchors:
+            pending.append(i)
+            continue
+
+        if pending:
+            low = positions[previous_anchor] if previous_anchor is not None else None
+            high = old_positions[names[i]] if i is not None else None
+            if low is None and high is None:
+                low, high = -1.0, float(len(pending))
+            elif low is None:
+                low = high - len(pending) - 1
+            elif high is None:
+                high = low + len(pending) + 1
+            step = (high - low) / (len(pending) + 1)
+            if step < MIN_POSITION_GAP:
+                return None
+            for offset, j in enumerate(pending, start=1):
+                positions[j] = low + step * offset
+            pending = []
+
+        if i is not None:
+            positions[i] = old_positions[names[i]]
+            previous_anchor = i
+    return positions
+
+
+class PriceHistory:
+    """
+    按日期保存的价格表历史
+
+    参数:
+        path (str): SQLite 文件路径
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS prices ('
+                ' kind TEXT NOT NULL,'
+                ' name TEXT NOT NULL,'
+                ' valid_from TEXT NOT NULL,'
+                ' price REAL,'
+                ' position REAL,'
+                ' removed INTEGER NOT NULL DEFAULT 0,'
+                ' PRIMARY KEY (kind, name, valid_from))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS versions ('
+                ' kind TEXT NOT NULL,'
+                ' valid_from TEXT NOT NULL,'
+                ' loaded_at REAL NOT NULL,'
+                ' row_count INTEGER NOT NULL,'
+                ' PRIMARY KEY (kind, valid_from))'
+            )
+
+    def apply(self, kind, date, table):
+        """
+        保存某天的价格表，只写入与前一个版本不同的菜品
+
+        同一天重复保存时替换当天的版本；补录较早的日期时，
+        之后一个版本会按新的前一版本重新计算差异，还原结果不受影响。
+
+        参数:
+            kind (str): 表格种类（'price' 定价表、'purchase' 进价表）
+            date (date or str): 生效日期
+            table (dict): {菜品名: 价格}
+
+        返回:
+            dict: 变化数量 {'added': 新增, 'changed': 改价, 'removed': 删除, 'moved': 仅顺序变化}
+        """
+        day = _date_key(date)
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            later = conn.execute(
+                'SELECT MIN(valid_from) FROM versions WHERE kind = ? AND valid_from > ?',
+                (kind, day),
+            ).fetchone()[0]
+            later_table = self._state(conn, kind, later) if later else None
+
+            summary = self._write_version(conn, kind, day, table)
+            if later:
+                # 之后的版本保持原有价格和位置不变，只是改为相对新的前一版本记录差异
+                self._write_version(conn, kind, later, {name: price for name, (price, _) in later_table.items()},
+                                    [position for _, position in later_table.values()])
+        return summary
+
+    def as_of(self, kind, date):
+        """
+        还原某天生效的价格表
+
+        参数:
+            kind (str): 表格种类
+            date (date or str): 日期
+
+        返回:
+            dict or None: {菜品名: 价格}，顺序与当时上传的表一致；该日期及之前没有任何版本时返回 None
+        """
+        day = _date_key(date)
+        with closing(sqlite3.connect(self.path)) as conn:
+            first = conn.execute(
+                'SELECT MIN(valid_from) FROM versions WHERE kind = ?', (kind,)
+            ).fetchone()[0]
+            if first is None or first > day:
+                return None
+            return {name: price for name, (price, _) in self._state(conn, kind, day).items()}
+
+    def versions(self, kind):
+        """
+        已保存的版本
+
+        返回:
+            list: [(生效日期, 菜品数量), ...]，按日期排序
+        """
+        with closing(sqlite3.connect(self.path)) as conn:
+            return conn.execute(
+                'SELECT valid_from, row_count FROM versions WHERE kind = ? ORDER BY valid_from', (kind,)
+            ).fetchall()
+
+    def _state(self, conn, kind, day, before=False):
+        """
+        某天（before=True 时为前一天）的价格表及位置
+
+        返回:
+            dict: {菜品名: (价格, 位置)}，按位置排序
+        """
+        operator = '<' if before else '<='
+        # SQLite 中与 MAX() 一起查询的其他列取自最大值所在的那一行
+        rows = conn.execute(
+            f'SELECT name, MAX(valid_from), price, position, removed FROM prices'
+            f' WHERE kind = ? AND valid_from {operator} ? GROUP BY name',
+            (kind, day),
+        ).fetchall()
+        rows = sorted((position, name, price) for name, _, price, position, removed in rows if not removed)
+        return {name: (float('nan') if price is None else price, position) for position, name, price in rows}
+
+    def _write_version(self, conn, kind, day, table, positions=None):
+        """
+        写入一天的版本：先删除当天已有的记录，再写入与前一版本的差异
+
+        参数:
+            positions (list): 指定各菜品的位置，默认根据前一版本分配
+        """
+        conn.execute('DELETE FROM prices WHERE kind = ? AND valid_from = ?', (kind, day))
+        previous = self._state(conn, kind, day, before=True)
+
+        names = list(table)
+        renumber = False
+        if positions is None:
+            positions = _assign_positions(names, {name: position for name, (_, position) in previous.items()})
+            renumber = positions is None
+            if renumber:
+                positions = [float(i) for i in range(len(names))]
+
+        summary = {'added': 0, 'changed': 0, 'removed': 0, 'moved': 0}
+        rows = []
+        for name, position in zip(names, positions):
+            price = table[name]
+            old = previous.get(name)
+            if old is None:
+                summary['added'] += 1
+            elif not _same_price(old[0], price):
+                summary['changed'] += 1
+            elif old[1] != position:
+                summary['moved'] += 1
+            elif not renumber:
+                continue
+            rows.append((kind, name, day, None if math.isnan(price) else price, position, 0))
+        for name in previous.keys() - table.keys():
+            summary['removed'] += 1
+            rows.append((kind, name, day, None, None, 1))
+
+        conn.executemany(
+            'INSERT INTO prices (kind, name, valid_from, price, position, removed) VALUES (?, ?, ?, ?, ?, ?)',
+            rows,
+        )
+        conn.execute(
+            'INSERT OR REPLACE INTO versions (kind, valid_from, loaded_at, row_count) VALUES (?, ?, ?, ?)',
+            (kind, day, time.time(), len(table)),
+        )
+        return summary
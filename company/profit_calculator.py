@@ -2,144 +2,399 @@
 # -*- coding: utf-8 -*-
 """
 利润计算模块 - 计算利润并生成Excel
+
+计算结果保存在 ProfitReport 中，可以分别导出为 Excel、CSV、JSON、Parquet，
+网页预览、下载和存档共用同一次计算。
 """
 
+import json
+from itertools import islice
+
+import numpy as np
 import pandas as pd
-from matcher import find_matching_price
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from matcher import match_many
+from order_batch import OrderBatch
+
+# 匹配不到价格时写入利润表的占位值
+MISSING_PRICE = "000000"
+
+# 利润表的列；其中可能匹配不到价格的列
+PROFIT_COLUMNS = ['单位', '菜品', '数量', '定价', '进价', '单品利润', '总利润', '总金额']
+PRICE_COLUMNS = ['定价', '进价', '单品利润', '总利润', '总金额']
+
+SHEET_NAME = '利润表'
+COLUMN_WIDTHS = {'A': 20, 'B': 15, 'C': 10, 'D': 10, 'E': 10, 'F': 12, 'G': 12, 'H': 14}
+
+# 按单位分表时的汇总表
+SUMMARY_SHEET_NAME = '汇总'
+UNIT_SUMMARY_COLUMNS = ['单位', '行数', '数量', '总金额', '总利润']
+SUMMARY_COLUMN_WIDTHS = {'A': 20, 'B': 10, 'C': 12, 'D': 14, 'E': 14}
+
+# 工作表名称不能包含的字符及最大长度
+INVALID_SHEET_CHARS = '[]:*?/\\'
+MAX_SHEET_TITLE = 31
+
+# 表头、总计行的命名样式
+HEADER_STYLE = '利润表表头'
+TOTAL_STYLE = '利润表总计'
 
 
-def calculate_profit_and_generate_excel(orders, price_table, purchase_table, output_file):
+def _price_column(values):
     """
-    计算利润并生成Excel文件
-    
+    匹配结果转为数值列
+
     参数:
-        orders (list): 订单列表
-        price_table (dict): 定价表
-        purchase_table (dict): 进价表
-        output_file (str): 输出文件路径
-    
+        values (list): 匹配到的价格，匹配不到的为 "000000"
+
     返回:
-        float: 总利润
+        ndarray: float 数组，匹配不到的为 NaN
+    """
+    return np.array([np.nan if value == MISSING_PRICE else value for value in values], dtype=float)
+
+
+class ProfitReport:
+    """
+    一次利润计算的结果
+
+    参数:
+        frame (DataFrame): 订单明细，列为 PROFIT_COLUMNS，按单位、菜品排序；匹配不到的价格为 NaN
+        matches (DataFrame): 每个不同菜品的匹配结果，列为 菜品、定价、进价；匹配不到的为 NaN
+    """
+
+    def __init__(self, frame, matches):
+        self.frame = frame
+        self.matches = matches
+        # 合计跳过匹配不到价格的行
+        self.total_profit = float(np.nansum(frame['总利润'].to_numpy()))
+        self.total_amount = float(np.nansum(frame['总金额'].to_numpy()))
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def unmatched_dishes(self):
+        """定价或进价匹配不到的菜品名"""
+        missing = self.matches['定价'].isna() | self.matches['进价'].isna()
+        return self.matches.loc[missing, '菜品'].tolist()
+
+    def total_row(self):
+        """总计行的各列数值，空白列为 None"""
+        values = {'单位': '总计', '总利润': self.total_profit, '总金额': self.total_amount}
+        return [values.get(column) for column in PROFIT_COLUMNS]
+
+    def by_unit(self):
+        """
+        各单位小计（一次分组完成）
+
+        返回:
+            DataFrame: 列为 单位、行数、数量、总金额、总利润，按单位排序；匹配不到价格的行不计入金额和利润
+        """
+        # 明细已按单位排序，sort=False 保持这个顺序，各单位的行在明细中连续
+        subtotals = self.frame.groupby('单位', sort=False).agg(
+            行数=('数量', 'size'), 数量=('数量', 'sum'), 总金额=('总金额', 'sum'), 总利润=('总利润', 'sum'))
+        return subtotals.reset_index()[UNIT_SUMMARY_COLUMNS]
+
+    def to_display_frame(self):
+        """
+        与利润表内容相同的表格
+
+        返回:
+            DataFrame: 匹配不到的价格为 "000000"，最后一行为总计
+        """
+        df = self.frame.astype({column: object for column in PRICE_COLUMNS})
+        df[PRICE_COLUMNS] = df[PRICE_COLUMNS].where(df[PRICE_COLUMNS].notna(), MISSING_PRICE)
+        total_row = pd.DataFrame([self.total_row()], columns=PROFIT_COLUMNS)
+        return pd.concat([df, total_row], ignore_index=True)
+
+
+def compute_profit_report(orders, price_table, purchase_table, match_cache=None, match_memo=None):
     """
+    计算利润
+
+    参数:
+        orders (iterable): 订单列表、逐条产出订单的迭代器（如 parser.iter_orders）或 OrderBatch
+        price_table (dict or PriceIndex): 定价表
+        purchase_table (dict or PriceIndex): 进价表
+        match_cache (MatchCache): 菜品匹配结果缓存，可选
+        match_memo (dict): {订单菜品名: (定价, 进价)}，同一对定价表/进价表多次计算时传入同一个字典，
+                           只匹配之前没有出现过的菜品名，可选
+
+    返回:
+        ProfitReport: 计算结果
+    """
+    # 订单转为列式批次（列表、迭代器都可以），每个不同的菜品只匹配一次
+    batch = OrderBatch.from_orders(orders)
+
     # 数据验证
-    if not orders:
+    if not len(batch):
         raise ValueError("订单列表为空，请检查文字列表格式")
-    
-    # 构建数据列表
-    data = []
-    
-    for order in orders:
-        # 验证订单数据完整性
-        if '单位' not in order:
-            order['单位'] = '未指定单位'
-        if '菜品' not in order:
-            continue  # 跳过无效订单
-        if '数量' not in order:
-            order['数量'] = 0
-        unit = order['单位']
-        vegetable = order['菜品']
-        quantity = order['数量']
-
-        # 使用更强的模糊匹配逻辑
-        from matcher import fuzzy_find_price, find_matching_cost_price
-        selling_price = fuzzy_find_price(vegetable, price_table)
-        # 进价使用专门的进价匹配函数，支持规格通用匹配
-        purchase_price = find_matching_cost_price(vegetable, purchase_table)
-
-        # 计算利润
-        if selling_price != "000000" and purchase_price != "000000":
-            unit_profit = selling_price - purchase_price
-            total_profit = unit_profit * quantity
-        else:
-            unit_profit = "000000"
-            total_profit = "000000"
-
-        # 计算总金额（定价*数量），如果定价为000000则为000000
-        if selling_price != "000000":
-            total_amount = selling_price * quantity
-        else:
-            total_amount = "000000"
-
-        data.append({
-            '单位': unit,
-            '菜品': vegetable,
-            '数量': quantity,
-            '定价': selling_price,
-            '进价': purchase_price,
-            '单品利润': unit_profit,
-            '总利润': total_profit,
-            '总金额': total_amount
-        })
-    
-    # 创建DataFrame
-    df = pd.DataFrame(data)
-    
+
+    # 定价使用更强的模糊匹配逻辑，进价使用专门的进价匹配函数，支持规格通用匹配
+    dish_prices = match_many(batch.dishes, price_table, purchase_table, cache=match_cache, memo=match_memo)
+    dish_selling = _price_column([price for price, _ in dish_prices])
+    dish_purchase = _price_column([cost for _, cost in dish_prices])
+
+    # 按菜品编号整列展开；匹配不到的价格为 NaN
+    selling_prices = dish_selling[batch.dish_codes]
+    purchase_prices = dish_purchase[batch.dish_codes]
+    quantities = batch.quantities
+
+    # 计算利润：定价、进价都匹配到时才有值；总金额 = 定价 * 数量
+    unit_profit = selling_prices - purchase_prices
+
+    df = pd.DataFrame({
+        '单位': batch.unit_column(),
+        '菜品': batch.dish_column(),
+        '数量': quantities,
+        '定价': selling_prices,
+        '进价': purchase_prices,
+        '单品利润': unit_profit,
+        '总利润': unit_profit * quantities,
+        '总金额': selling_prices * quantities,
+    })
+
     # 按单位分组排序
-    df = df.sort_values(by=['单位', '菜品'])
-    
-    # 计算总利润
-    total_profit_sum = 0
-    for profit in df['总利润']:
-        if profit != "000000":
-            total_profit_sum += profit
-    
-    # 计算总金额合计
-    total_amount_sum = 0
-    if '总金额' in df.columns:
-        for amount in df['总金额']:
-            if amount != "000000":
-                total_amount_sum += amount
-
-    # 添加总计行
-    total_row = pd.DataFrame([{
-        '单位': '总计',
-        '菜品': '',
-        '数量': '',
-        '定价': '',
-        '进价': '',
-        '单品利润': '',
-        '总利润': total_profit_sum,
-        '总金额': total_amount_sum
-    }])
-    df = pd.concat([df, total_row], ignore_index=True)
-    
-    # 保存到Excel
+    df = df.sort_values(by=['单位', '菜品']).reset_index(drop=True)
+
+    matches = pd.DataFrame({'菜品': pd.Series(batch.dishes, dtype=object), '定价': dish_selling, '进价': dish_purchase})
+    return ProfitReport(df, matches)
+
+
+def calculate_profit_and_generate_excel(orders, price_table, purchase_table, output_file, match_cache=None,
+                                       match_memo=None, streaming=False, by_unit=False):
+    """
+    计算利润并生成Excel文件
+
+    参数:
+        orders (iterable): 订单列表、逐条产出订单的迭代器（如 parser.iter_orders）或 OrderBatch
+        price_table (dict or PriceIndex): 定价表
+        purchase_table (dict or PriceIndex): 进价表
+        output_file (str or file-like): 输出文件路径，或可写的二进制流（如 io.BytesIO，生成后流不会被关闭）
+        match_cache (MatchCache): 菜品匹配结果缓存，可选
+        match_memo (dict): {订单菜品名: (定价, 进价)}，同一对定价表/进价表多次生成时传入同一个字典，
+                           只匹配之前没有出现过的菜品名，可选
+        streaming (bool): 是否逐行写入（openpyxl 只写模式），适合几万行的大表，内存占用不随行数增长
+        by_unit (bool): 是否按单位分表：汇总表（各单位行数、数量、总金额、总利润）加每个单位一个工作表
+
+    返回:
+        float: 总利润
+    """
+    report = compute_profit_report(orders, price_table, purchase_table, match_cache=match_cache,
+                                   match_memo=match_memo)
+    render_excel(report, output_file, streaming=streaming, by_unit=by_unit)
+    return report.total_profit
+
+
+def render_excel(report, output_file, streaming=False, by_unit=False):
+    """
+    导出为 Excel 利润表
+
+    参数:
+        report (ProfitReport): 计算结果
+        output_file (str or file-like): 输出文件路径或可写的二进制流
+        streaming (bool): 是否逐行写入（openpyxl 只写模式）
+        by_unit (bool): 是否按单位分表：一个汇总表加每个单位一个工作表（总是逐行写入）
+    """
+    if by_unit:
+        _write_unit_sheets(report, output_file)
+    elif streaming:
+        _write_profit_sheet_streaming(report, output_file)
+    else:
+        _write_profit_sheet(report, output_file)
+
+
+def render_csv(report, output_file):
+    """
+    导出为 CSV（内容与利润表相同，UTF-8 带 BOM，Excel 可直接打开）
+
+    参数:
+        report (ProfitReport): 计算结果
+        output_file (str or file-like): 输出文件路径或可写的二进制流
+    """
+    report.to_display_frame().to_csv(output_file, index=False, encoding='utf-8-sig')
+
+
+def render_json(report, output_file=None):
+    """
+    导出为 JSON：合计、订单明细和匹配不到价格的菜品，匹配不到的价格为 null
+
+    参数:
+        report (ProfitReport): 计算结果
+        output_file (str or file-like): 输出文件路径或可写的二进制流，None 时只返回文本
+
+    返回:
+        str: JSON 文本
+    """
+    frame = report.frame.astype(object)
+    rows = frame.where(frame.notna(), None).to_dict('records')
+    text = json.dumps({
+        '总利润': report.total_profit,
+        '总金额': report.total_amount,
+        '明细': rows,
+        '未匹配菜品': report.unmatched_dishes,
+    }, ensure_ascii=False)
+
+    if output_file is None:
+        return text
+    data = text.encode('utf-8')
+    if hasattr(output_file, 'write'):
+        output_file.write(data)
+    else:
+        with open(output_file, 'wb') as f:
+            f.write(data)
+    return text
+
+
+def render_parquet(report, output_file):
+    """
+    导出为 Parquet（需要安装 pyarrow），用于存档：价格为数值列、匹配不到的为空值，不含总计行
+
+    参数:
+        report (ProfitReport): 计算结果
+        output_file (str or file-like): 输出文件路径或可写的二进制流
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError('写入 Parquet 文件需要安装 pyarrow：pip install pyarrow')
+    report.frame.to_parquet(output_file, index=False)
+
+
+def _named_styles():
+    """表头、总计行的命名样式（每个工作簿需要各自的样式对象）"""
+    header = NamedStyle(
+        name=HEADER_STYLE,
+        font=Font(bold=True, size=12, color="FFFFFF"),
+        fill=PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid"),
+        alignment=Alignment(horizontal='center', vertical='center'),
+    )
+    total = NamedStyle(
+        name=TOTAL_STYLE,
+        font=Font(bold=True, size=11),
+        fill=PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid"),
+    )
+    return header, total
+
+
+def _prepare_sheet(workbook, worksheet, column_widths=COLUMN_WIDTHS):
+    """注册命名样式并设置列宽（逐行写入模式下必须在写入第一行之前调用）"""
+    for style in _named_styles():
+        if style.name not in workbook.named_styles:
+            workbook.add_named_style(style)
+    for column, width in column_widths.items():
+        worksheet.column_dimensions[column].width = width
+
+
+def _write_profit_sheet(report, output_file):
+    """用 pandas 写入利润表，再在内存中的工作表上设置样式"""
+    df = report.to_display_frame()
+
+    # 保存到Excel；样式需要在保存之前设置
     with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='利润表')
-        
-        # 获取工作表
-        workbook = writer.book
-        worksheet = writer.sheets['利润表']
-        
-        # 设置列宽
-        worksheet.column_dimensions['A'].width = 20
-        worksheet.column_dimensions['B'].width = 15
-        worksheet.column_dimensions['C'].width = 10
-        worksheet.column_dimensions['D'].width = 10
-        worksheet.column_dimensions['E'].width = 10
-        worksheet.column_dimensions['F'].width = 12
-        worksheet.column_dimensions['G'].width = 12
-        worksheet.column_dimensions['H'].width = 14
-
-    # 设置表头样式
-    from openpyxl.styles import Font, Alignment, PatternFill
-
-    header_font = Font(bold=True, size=12)
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    header_alignment = Alignment(horizontal='center', vertical='center')
-
-    for cell in worksheet[1]:
-        cell.font = Font(bold=True, size=12, color="FFFFFF")
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    # 设置总计行样式
-    last_row = len(df) + 1
-    for cell in worksheet[last_row]:
-        cell.font = Font(bold=True, size=11)
-        cell.fill = PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid")
-    
-    return total_profit_sum
+        df.to_excel(writer, index=False, sheet_name=SHEET_NAME)
+
+        worksheet = writer.sheets[SHEET_NAME]
+        _prepare_sheet(writer.book, worksheet)
+        for cell in worksheet[1]:
+            cell.style = HEADER_STYLE
+        for cell in worksheet[len(df) + 1]:
+            cell.style = TOTAL_STYLE
+
+
+def _styled_row(worksheet, values, style):
+    """逐行写入模式下带命名样式的一行单元格"""
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.style = style
+        cells.append(cell)
+    return cells
+
+
+def _append_profit_rows(worksheet, rows):
+    """逐行写入订单明细，匹配不到的价格显示为 000000"""
+    price_positions = [PROFIT_COLUMNS.index(column) for column in PRICE_COLUMNS]
+    for row in rows:
+        row = list(row)
+        for i in price_positions:
+            if row[i] != row[i]:
+                row[i] = MISSING_PRICE
+        worksheet.append(row)
+
+
+def _write_profit_sheet_streaming(report, output_file):
+    """
+    逐行写入利润表（openpyxl 只写模式）
+
+    不在内存中保留单元格对象，几万行的月末汇总表内存占用也不随行数增长；
+    表头、总计行的样式通过命名样式设置，与默认模式生成的表格相同。
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(SHEET_NAME)
+    _prepare_sheet(workbook, worksheet)
+
+    worksheet.append(_styled_row(worksheet, PROFIT_COLUMNS, HEADER_STYLE))
+    _append_profit_rows(worksheet, report.frame[PROFIT_COLUMNS].itertuples(index=False, name=None))
+    worksheet.append(_styled_row(worksheet, report.total_row(), TOTAL_STYLE))
+
+    workbook.save(output_file)
+
+
+def _sheet_title(name, used_titles):
+    """
+    单位名转为合法且不重复的工作表名称
+
+    参数:
+        name (str): 单位名
+        used_titles (set): 已使用的名称（小写），会加入本次的结果
+
+    返回:
+        str: 工作表名称
+    """
+    title = ''.join('_' if char in INVALID_SHEET_CHARS else char for char in str(name)).strip("'")
+    title = title[:MAX_SHEET_TITLE] or '_'
+    number = 1
+    candidate = title
+    while candidate.lower() in used_titles:
+        number += 1
+        suffix = f'({number})'
+        candidate = title[:MAX_SHEET_TITLE - len(suffix)] + suffix
+    used_titles.add(candidate.lower())
+    return candidate
+
+
+def _write_unit_sheets(report, output_file):
+    """
+    按单位分表：汇总表加每个单位一个工作表，逐行写入、一次保存
+
+    各单位小计由一次分组得到；明细按单位排序，各单位的行是连续的，
+    所以只需顺序遍历一遍明细，按小计中的行数依次写入各单位的工作表，不必为每个单位筛选整张表。
+    """
+    subtotals = report.by_unit()
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+
+    summary = workbook.create_sheet(_sheet_title(SUMMARY_SHEET_NAME, used_titles))
+    _prepare_sheet(workbook, summary, SUMMARY_COLUMN_WIDTHS)
+    summary.append(_styled_row(summary, UNIT_SUMMARY_COLUMNS, HEADER_STYLE))
+    for row in subtotals.itertuples(index=False, name=None):
+        summary.append(list(row))
+    summary.append(_styled_row(summary, ['总计', len(report), float(subtotals['数量'].sum()),
+                                         report.total_amount, report.total_profit], TOTAL_STYLE))
+
+    rows = report.frame[PROFIT_COLUMNS].itertuples(index=False, name=None)
+    for unit, count, quantity, amount, profit in subtotals.itertuples(index=False, name=None):
+        worksheet = workbook.create_sheet(_sheet_title(unit, used_titles))
+        _prepare_sheet(workbook, worksheet)
+        worksheet.append(_styled_row(worksheet, PROFIT_COLUMNS, HEADER_STYLE))
+        _append_profit_rows(worksheet, islice(rows, count))
+        subtotal = {'单位': '小计', '数量': quantity, '总利润': profit, '总金额': amount}
+        worksheet.append(_styled_row(worksheet, [subtotal.get(column) for column in PROFIT_COLUMNS], TOTAL_STYLE))
+
+    workbook.save(output_file)
 
 
 if __name__ == "__main__":
@@ -148,9 +403,9 @@ if __name__ == "__main__":
         {'单位': '一中五食堂', '菜品': '胡萝卜', '数量': 20},
         {'单位': '一中五食堂', '菜品': '尖椒', '数量': 20},
     ]
-    
+
     price_table = {'胡萝卜': 5, '尖椒': 8}
     purchase_table = {'胡萝卜': 3, '尖椒': 5}
-    
+
     total = calculate_profit_and_generate_excel(orders, price_table, purchase_table, "测试.xlsx")
     print(f"总利润: {total}")
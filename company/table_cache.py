@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+价格表缓存模块 - 按上传文件内容的 SHA-256 缓存解析结果和匹配索引
+
+同一份定价表/进价表（内容完全相同）只解析一次：
+- 进程内 LRU 缓存：网页每次刷新、不同员工上传同一份表都直接命中
+- 磁盘缓存（可选）：程序重启后仍可命中
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from matcher import MATCH_RULES_VERSION, PriceIndex, default_alias_groups
+
+# 进程内最多缓存的表格数量
+DEFAULT_MAX_ENTRIES = 16
+
+# 缓存内容（价格字典 + PriceIndex）的格式版本，PriceIndex 的内部结构改变时加 1；
+# 与 MATCH_RULES_VERSION 一起写进缓存键，旧版本程序写入的磁盘缓存不会被读取
+CACHE_SCHEMA_VERSION = 1
+
+
+class TableCache:
+    """
+    价格表解析结果缓存
+
+    参数:
+        max_entries (int): 进程内缓存的最大表格数量
+        disk_dir (str): 磁盘缓存目录，None 表示不使用磁盘缓存
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def content_hash(data):
+        """文件内容的 SHA-256"""
+        return hashlib.sha256(data).hexdigest()
+
+    def get_or_load(self, data, kind, loader):
+        """
+        取出缓存的价格表及其匹配索引，未命中时调用 loader 解析并写入缓存
+
+        参数:
+            data (bytes): 上传文件的内容
+            kind (str): 表格种类及读取参数（如 'price'、'purchase'），相同内容不同种类分别缓存
+            loader (callable): loader(data) -> dict，解析价格表
+
+        返回:
+            tuple: (价格字典, PriceIndex)
+        """
+        key = f'{self.content_hash(data)}-{kind}-v{MATCH_RULES_VERSION}.{CACHE_SCHEMA_VERSION}'
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            entry = self._read_disk(key)
+        if entry is None:
+            table = loader(data)
+            entry = (table, PriceIndex(table))
+            self._write_disk(key, entry)
+
+        # 别名表修改后，缓存的匹配索引需要重建，重建结果同时写回磁盘
+        table, index = entry
+        if index.aliases != default_alias_groups():
+            entry = (table, PriceIndex(table))
+            self._write_disk(key, entry)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        """清空进程内缓存（磁盘缓存保留）"""
+        with self._lock:
+            self._entries.clear()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.pkl')
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
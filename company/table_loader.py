@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+价格表读取模块 - 定价表、进价表共用的向量化读取逻辑
+
+支持两种格式：
+1. 标准格式（2列）：菜品 | 价格，第一行为表头
+2. 多组格式（4列及以上）：菜品1 | 价格1 | 菜品2 | 价格2 | 菜品3 | 价格3 ……，第一行可能是表头
+
+整张表只读取一次，按列整体转换价格、用掩码过滤无效行，不再逐行处理。
+超大的 xlsx 可使用流式读取（iter_price_pairs），逐行产出，内存占用不随表格大小增长。
+按品类分工作表的文件可读取全部工作表（all_sheets=True），各工作表由进程池并行解析。
+ERP 导出的 CSV、Parquet 文件同样支持，识别规则与 Excel 相同，读取速度快得多。
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# 2列格式：用于识别菜品列、价格列的列名关键字
+NAME_KEYWORDS = ['菜品', '名称', '品名', '商品']
+SELLING_PRICE_KEYWORDS = ['价格', '单价', '定价', '售价']
+PURCHASE_PRICE_KEYWORDS = ['价格', '单价', '进价', '成本']
+
+# 流式读取时，根据前多少行判断是2列还是多组格式
+LAYOUT_PROBE_ROWS = 20
+
+# CSV 文件依次尝试的编码（ERP 导出的中文 CSV 常为 GBK）
+CSV_ENCODINGS = ('utf-8-sig', 'gb18030')
+
+# 多组格式（4列及以上）：第一行出现这些文字时视为表头
+SELLING_HEADER_WORDS = ['品名', '菜品', '名称', '单价', '价格', '定价']
+PURCHASE_HEADER_WORDS = ['品名', '菜品', '名称', '单价', '价格', '定价', '进价', '成本']
+
+
+def _clean_names(values):
+    """
+    整列处理菜品名：转为去除首尾空白的字符串
+
+    返回:
+        tuple: (菜品名数组, 是否有效)；空值、空字符串和 'nan' 无效
+    """
+    series = pd.Series(values, dtype=object)
+    if pd.api.types.infer_dtype(series, skipna=True) == 'string':
+        # 整列都是文字（CSV、Parquet 的常见情况）时直接整列去空白，空值位置不会被保留
+        names = series.str.strip()
+    else:
+        names = series.map(lambda value: str(value).strip())
+    valid = series.notna() & (names != '') & (names != 'nan')
+    return names.to_numpy(dtype=object), valid.to_numpy(dtype=bool)
+
+
+def _to_float(values):
+    """
+    整列把价格转换为浮点数，结果与逐个 float() 一致
+
+    返回:
+        tuple: (价格数组, 是否转换成功)；空值视为转换失败
+    """
+    series = pd.Series(values, dtype=object)
+    prices = pd.to_numeric(series, errors='coerce').astype(float)
+    valid = prices.notna()
+    # to_numeric 不认识、float() 却能转换的少数写法（如 'nan'、'1_000'）逐个补充
+    for i in np.flatnonzero(~valid.to_numpy() & series.notna().to_numpy()):
+        try:
+            prices.iat[i] = float(series.iat[i])
+            valid.iat[i] = True
+        except (ValueError, TypeError):
+            pass
+    return prices.to_numpy(dtype=float), valid.to_numpy(dtype=bool)
+
+
+def _find_columns(header, name_keywords, price_keywords):
+    """
+    2列格式：按表头关键字查找菜品列和价格列，找不到时使用前两列
+
+    返回:
+        tuple: (菜品列位置, 价格列位置)
+    """
+    name_col = None
+    price_col = None
+    for position, col in enumerate(header):
+        col_lower = str(col).lower()
+        if any(keyword in col_lower for keyword in name_keywords):
+            name_col = position
+        elif any(keyword in col_lower for keyword in price_keywords):
+            price_col = position
+    if name_col is None:
+        name_col = 0
+    if price_col is None:
+        price_col = 1
+    return name_col, price_col
+
+
+def _looks_numeric(value):
+    try:
+        float(value)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def _is_price_pair(name_values, price_values):
+    """
+    判断两列是否像一组菜品-价格对：菜品列大多是文字，价格列大多是数字
+
+    参数:
+        name_values (iterable): 菜品列前若干行的值
+        price_values (iterable): 价格列前若干行的值
+    """
+    names = [value for value in name_values if not pd.isna(value)]
+    prices = [value for value in price_values if not pd.isna(value)]
+    if not names or not prices:
+        return False
+    text_names = sum(not _looks_numeric(value) for value in names)
+    numeric_prices = sum(_looks_numeric(value) for value in prices)
+    return text_names * 2 >= len(names) and numeric_prices * 2 >= len(prices)
+
+
+def _pair_columns(width, probe):
+    """
+    多组格式：确定哪些相邻两列是菜品-价格对
+
+    前两组（第0,1列、第2,3列）总是读取；从第三组起，
+    只有根据前几行判断确实是菜品-价格对时才读取，避免把利润表、按日期排列的价格表等
+    其他宽表的数字列误当作菜品名。
+
+    参数:
+        width (int): 列数
+        probe (list): 表头之后的前若干行
+
+    返回:
+        list: [(菜品列位置, 价格列位置), ...]
+    """
+    columns = [(0, 1), (2, 3)]
+    for name_col in range(4, width - 1, 2):
+        name_values = [row[name_col] if name_col < len(row) else None for row in probe]
+        price_values = [row[name_col + 1] if name_col + 1 < len(row) else None for row in probe]
+        if _is_price_pair(name_values, price_values):
+            columns.append((name_col, name_col + 1))
+    return columns
+
+
+def pairs_from_frame(raw, header_words, name_keywords, price_keywords):
+    """
+    从不带表头读取的整张表中取出 (菜品名, 价格) 对
+
+    4列及以上：相邻两列是一组菜品-价格对（第0,1列、第2,3列，以及 _pair_columns
+    识别出的第4,5列、第6,7列……），按行依次取出各组，两者都非空且价格能转换为数字才保留；
+    第一行含表头文字时跳过。
+    2列：第一行为表头，按关键字找菜品列和价格列；价格为空的行保留为 NaN。
+
+    参数:
+        raw (DataFrame): pd.read_excel(..., header=None) 读出的表
+        header_words (list): 多组格式的表头识别文字
+        name_keywords (list): 2列格式的菜品列关键字
+        price_keywords (list): 2列格式的价格列关键字
+
+    返回:
+        tuple: (菜品名数组, 价格数组)，顺序与逐行读取一致
+    """
+    if len(raw.columns) >= 4:
+        start_row = 0
+        first_row = raw.iloc[0]
+        if any(str(val).strip() in header_words for val in first_row if pd.notna(val)):
+            start_row = 1
+
+        body = raw.iloc[start_row:].astype(object).to_numpy()
+        pair_columns = _pair_columns(body.shape[1], body[:LAYOUT_PROBE_ROWS - start_row].tolist())
+        # 按行展开：第0行第一组、第0行第二组……第1行第一组……
+        raw_names = body[:, [name_col for name_col, _ in pair_columns]].ravel()
+        raw_prices = body[:, [price_col for _, price_col in pair_columns]].ravel()
+        names, name_valid = _clean_names(raw_names)
+        prices, price_valid = _to_float(raw_prices)
+        keep = name_valid & pd.notna(raw_prices) & price_valid
+    else:
+        # 2列格式：第一行作为表头，其余行按列推断类型（与以表头方式读取一致）
+        name_col, price_col = _find_columns(raw.iloc[0].tolist() if len(raw) else raw.columns,
+                                            name_keywords, price_keywords)
+        body = raw.iloc[1:].astype(object)
+        name_values = pd.Series(body.iloc[:, name_col].tolist(), dtype=object).infer_objects()
+        price_values = pd.Series(body.iloc[:, price_col].tolist(), dtype=object).infer_objects()
+        names, name_valid = _clean_names(name_values)
+        prices, price_valid = _to_float(price_values)
+        keep = name_valid & (price_valid | price_values.isna().to_numpy())
+
+    return names[keep], prices[keep]
+
+
+def _column_to_float(column):
+    """整列转换价格；Parquet 中已是数值类型的列直接使用，不再逐个转换"""
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        prices = column.to_numpy(dtype=float, na_value=np.nan)
+        return prices, ~np.isnan(prices)
+    return _to_float(column)
+
+
+def pairs_from_columns(frame, name_keywords, price_keywords):
+    """
+    从带列名的表（Parquet）中取出 (菜品名, 价格) 对
+
+    列名即表头，其余规则与 pairs_from_frame 相同：4列及以上按菜品-价格对按行展开，
+    2列按列名关键字找菜品列和价格列。
+
+    参数:
+        frame (DataFrame): 带列名的表，各列保留原有类型
+        name_keywords (list): 2列格式的菜品列关键字
+        price_keywords (list): 2列格式的价格列关键字
+
+    返回:
+        tuple: (菜品名数组, 价格数组)
+    """
+    if len(frame.columns) >= 4:
+        probe = frame.head(LAYOUT_PROBE_ROWS).astype(object).to_numpy().tolist()
+        name_parts, price_parts, keep_parts = [], [], []
+        for name_col, price_col in _pair_columns(len(frame.columns), probe):
+            names, name_valid = _clean_names(frame.iloc[:, name_col])
+            prices, price_valid = _column_to_float(frame.iloc[:, price_col])
+            name_parts.append(names)
+            price_parts.append(prices)
+            keep_parts.append(name_valid & price_valid)
+        # 按行展开：第0行第一组、第0行第二组……第1行第一组……
+        names = np.column_stack(name_parts).ravel()
+        prices = np.column_stack(price_parts).ravel()
+        keep = np.column_stack(keep_parts).ravel()
+    else:
+        name_col, price_col = _find_columns(frame.columns, name_keywords, price_keywords)
+        names, name_valid = _clean_names(frame.iloc[:, name_col])
+        price_values = frame.iloc[:, price_col]
+        prices, price_valid = _column_to_float(price_values)
+        keep = name_valid & (price_valid | price_values.isna().to_numpy())
+
+    return names[keep], prices[keep]
+
+
+def detect_format(file_path, file_format=None):
+    """
+    判断价格表的文件格式
+
+    参数:
+        file_path (str or file-like): 文件路径或文件对象（按 name 属性的扩展名判断）
+        file_format (str): 明确指定的格式或扩展名（如 'csv'、'.parquet'），优先使用
+
+    返回:
+        str: 'excel'、'csv' 或 'parquet'
+    """
+    if file_format is None:
+        if isinstance(file_path, (str, os.PathLike)):
+            file_format = os.fspath(file_path)
+        else:
+            file_format = getattr(file_path, 'name', '') or ''
+        file_format = os.path.splitext(file_format)[1]
+    file_format = file_format.lower().lstrip('.')
+    if file_format == 'csv':
+        return 'csv'
+    if file_format in ('parquet', 'pq'):
+        return 'parquet'
+    return 'excel'
+
+
+def read_csv_raw(file_path):
+    """
+    不带表头读取 CSV，所有单元格保持原文字符串，与 pd.read_excel(..., header=None) 的结果同样使用
+
+    依次尝试 CSV_ENCODINGS 中的编码。
+    """
+    if isinstance(file_path, (str, os.PathLike)):
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    else:
+        data = file_path.read()
+    for encoding in CSV_ENCODINGS[:-1]:
+        try:
+            return pd.read_csv(io.BytesIO(data), header=None, dtype=str, encoding=encoding)
+        except UnicodeDecodeError:
+            pass
+    return pd.read_csv(io.BytesIO(data), header=None, dtype=str, encoding=CSV_ENCODINGS[-1])
+
+
+def read_parquet_frame(file_path):
+    """读取 Parquet 文件（需要安装 pyarrow）"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError('读取 Parquet 文件需要安装 pyarrow：pip install pyarrow')
+    return pd.read_parquet(file_path)
+
+
+def _cell_name(value):
+    """流式读取：单元格转为菜品名，无效时返回 None（整数值的小数按整数处理，与 pandas 读取一致）"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    name = str(value).strip()
+    if name == '' or name == 'nan':
+        return None
+    return name
+
+
+def _cell_price(value):
+    """流式读取：单元格转为价格，无法转换时返回 None"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _iter_sheet_pairs(worksheet, header_words, name_keywords, price_keywords, probe_rows):
+    """流式读取单个工作表，逐行产出 (菜品名, 价格)，规则与 pairs_from_frame 相同；不足2列的工作表跳过"""
+    rows = worksheet.iter_rows(values_only=True)
+    probe = list(islice(rows, probe_rows))
+    if not probe:
+        return
+    width = max(
+        (max((i + 1 for i, value in enumerate(row) if value is not None), default=0) for row in probe),
+        default=0,
+    )
+    if width < 2:
+        return
+    rows = chain(probe, rows)
+
+    if width >= 4:
+        start_row = 0
+        first_row = probe[0]
+        if any(str(val).strip() in header_words for val in first_row if val is not None):
+            start_row = 1
+            next(rows)
+        pair_columns = _pair_columns(width, probe[start_row:])
+        for row in rows:
+            row = tuple(row) + (None,) * (width - len(row))
+            for name_col, price_col in pair_columns:
+                if row[name_col] is None or row[price_col] is None:
+                    continue
+                name = _cell_name(row[name_col])
+                price = _cell_price(row[price_col])
+                if name is not None and price is not None:
+                    yield name, price
+    else:
+        header = next(rows)
+        name_col, price_col = _find_columns(header, name_keywords, price_keywords)
+        for row in rows:
+            name = _cell_name(row[name_col] if name_col < len(row) else None)
+            value = row[price_col] if price_col < len(row) else None
+            price = float('nan') if value is None else _cell_price(value)
+            if name is not None and price is not None:
+                yield name, price
+
+
+def iter_price_pairs(file_path, header_words, name_keywords, price_keywords,
+                     probe_rows=LAYOUT_PROBE_ROWS, all_sheets=False):
+    """
+    流式读取 xlsx 价格表，逐行产出 (菜品名, 价格)
+
+    使用 openpyxl 只读模式逐行迭代，不把整张表载入内存；
+    每个工作表根据前 probe_rows 行的列数判断2列还是多组格式，规则与 pairs_from_frame 相同。
+
+    参数:
+        file_path (str or file-like): xlsx 文件路径或文件对象
+        header_words (list): 多组格式的表头识别文字
+        name_keywords (list): 2列格式的菜品列关键字
+        price_keywords (list): 2列格式的价格列关键字
+        probe_rows (int): 用于判断格式的行数
+        all_sheets (bool): 是否按顺序读取全部工作表（否则只读第一个）
+
+    返回:
+        generator: 依次产出 (菜品名, 价格)
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheets = workbook.worksheets if all_sheets else workbook.worksheets[:1]
+        for worksheet in worksheets:
+            yield from _iter_sheet_pairs(worksheet, header_words, name_keywords, price_keywords, probe_rows)
+    finally:
+        workbook.close()
+
+
+def _read_sheet_pairs(source, sheet_name, header_words, name_keywords, price_keywords):
+    """
+    读取单个工作表的 (菜品名, 价格)，供进程池调用
+
+    参数:
+        source (str or bytes): 文件路径或文件内容
+        sheet_name (str): 工作表名
+
+    返回:
+        tuple: (菜品名列表, 价格列表)；空表或不足2列的工作表（如说明页）返回空列表
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    raw = pd.read_excel(source, sheet_name=sheet_name, header=None)
+    if raw.empty or len(raw.columns) < 2:
+        return [], []
+    names, prices = pairs_from_frame(raw, header_words, name_keywords, price_keywords)
+    return names.tolist(), prices.tolist()
+
+
+def load_all_sheets(file_path, header_words, name_keywords, price_keywords, max_workers=None):
+    """
+    读取全部工作表并合并
+
+    各工作表由进程池并行解析，总耗时接近最大的那个工作表；
+    合并结果与按工作表顺序从上到下依次读取完全一致：
+    重名菜品保留第一次出现的位置，价格以靠后的工作表（同一工作表内靠下的行）为准。
+
+    参数:
+        file_path (str or file-like): Excel 文件路径或文件对象
+        header_words (list): 多组格式的表头识别文字
+        name_keywords (list): 2列格式的菜品列关键字
+        price_keywords (list): 2列格式的价格列关键字
+        max_workers (int): 最多使用的进程数，默认与 CPU 核数相同；1 表示不使用进程池
+
+    返回:
+        dict: {菜品名: 价格}
+    """
+    # 文件对象不能传给子进程，读出内容后按 bytes 传递
+    if isinstance(file_path, (str, os.PathLike)):
+        source = os.fspath(file_path)
+    else:
+        source = file_path.read()
+    with pd.ExcelFile(io.BytesIO(source) if isinstance(source, bytes) else source) as workbook:
+        sheet_names = workbook.sheet_names
+
+    workers = min(len(sheet_names), max_workers or os.cpu_count() or 1)
+    args = (header_words, name_keywords, price_keywords)
+    if workers <= 1:
+        results = [_read_sheet_pairs(source, name, *args) for name in sheet_names]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_read_sheet_pairs, source, name, *args) for name in sheet_names]
+            results = [future.result() for future in futures]
+
+    table = {}
+    for names, prices in results:
+        table.update(zip(names, prices))
+    return table
+
+
+def load_price_table(file_path, header_words, name_keywords, price_keywords, streaming=False,
+                     all_sheets=False, file_format=None):
+    """
+    读取定价表/进价表（Excel、CSV 或 Parquet）
+
+    参数:
+        file_path (str or file-like): 文件路径或文件对象
+        header_words (list): 多组格式的表头识别文字
+        name_keywords (list): 2列格式的菜品列关键字
+        price_keywords (list): 2列格式的价格列关键字
+        streaming (bool): 是否流式读取（仅支持 xlsx，适合几万行的平台导出表）
+        all_sheets (bool): 是否读取全部工作表（否则只读第一个）；流式读取时按顺序逐个读取
+        file_format (str): 文件格式（'excel'、'csv'、'parquet' 或扩展名），默认按文件扩展名判断；
+                           CSV、Parquet 没有工作表，也不需要流式读取，忽略 streaming 和 all_sheets
+
+    返回:
+        dict: {菜品名: 价格}；重名时保留第一次出现的位置、最后一次出现的价格
+    """
+    file_format = detect_format(file_path, file_format)
+    if file_format == 'csv':
+        names, prices = pairs_from_frame(read_csv_raw(file_path), header_words, name_keywords, price_keywords)
+        return dict(zip(names.tolist(), prices.tolist()))
+    if file_format == 'parquet':
+        names, prices = pairs_from_columns(read_parquet_frame(file_path), name_keywords, price_keywords)
+        return dict(zip(names.tolist(), prices.tolist()))
+
+    if streaming:
+        return dict(iter_price_pairs(file_path, header_words, name_keywords, price_keywords,
+                                     all_sheets=all_sheets))
+    if all_sheets:
+        return load_all_sheets(file_path, header_words, name_keywords, price_keywords)
+    raw = pd.read_excel(file_path, header=None)
+    names, prices = pairs_from_frame(raw, header_words, name_keywords, price_keywords)
+    return dict(zip(names.tolist(), prices.tolist()))
@@ -61,6 +61,31 @@ def test_parser():
     for order in orders[:3]:
         print(f"  - {order['单位']}: {order['菜品']} {order['数量']}斤")
     
+    # 列式订单批次
+    from order_batch import OrderBatch
+    batch = OrderBatch.from_text(test_text)
+    print(f"✓ 订单批次：{len(batch)} 行，{len(batch.units)} 个单位，{len(batch.dishes)} 个菜品")
+    assert batch.to_orders() == orders
+    assert batch.to_frame()['单位'].tolist() == [order['单位'] for order in orders]
+    
+    # 一行多个菜品
+    orders = parse_text_list("一中五食堂\n胡萝卜20斤 尖椒1号15斤，黄瓜10.5斤")
+    print(f"✓ 一行多个菜品：{[order['菜品'] for order in orders]}")
+    assert [(order['菜品'], order['数量']) for order in orders] == [('胡萝卜', 20), ('尖椒1号', 15), ('黄瓜', 10.5)]
+    
+    # 菜品名两端的 Unicode 空白（不换行空格、四分之一空格等）一并去除
+    orders = parse_text_list("一中五食堂\n胡萝卜\xa020斤\u2005尖椒1号\xa0，15斤")
+    assert [order['菜品'] for order in orders] == ['胡萝卜', '尖椒1号']
+
+    # 增量解析：只解析改动的行，单位归属随之更新
+    from order_batch import IncrementalOrderParser
+    incremental = IncrementalOrderParser()
+    assert incremental.parse(test_text).to_orders() == parse_text_list(test_text)
+    edited = test_text.replace("一中五食堂", "一中六食堂").replace("胡萝卜20斤", "胡萝卜25斤")
+    assert incremental.parse(edited).to_orders() == parse_text_list(edited)
+    print(f"✓ 增量解析：修改后重新解析 {incremental.last_parsed_lines} 行")
+    assert incremental.last_parsed_lines == 2
+
     print()
 
 
@@ -101,6 +126,369 @@ def test_matcher():
         print("\n✗ 部分匹配测试失败！\n")
 
 
+def test_price_index():
+    """测试匹配索引与逐条匹配结果一致"""
+    print("=" * 60)
+    print("测试3b: 价格表匹配索引")
+    print("=" * 60)
+    
+    from matcher import build_price_index, find_matching_price, find_matching_cost_price
+    
+    price_dict = {
+        '[嘉泽] XS-白萝卜': 0.9,
+        '[嘉泽]XS-白萝卜(一级品)': 1.1,
+        '[嘉泽] XS-大白菜(一级品)': 1.1,
+        '尖椒1号': 8.0,
+        '尖椒2号': 9.0,
+        '胡萝卜': 5.0,
+    }
+    aliases = [['胡萝卜', '红萝卜']]
+    index = build_price_index(price_dict, aliases=aliases)
+    
+    test_cases = [
+        ('白萝卜', 0.9, 0.9),
+        ('白萝卜一级品', 1.1, 1.1),
+        ('大白菜一级品', 1.1, 1.1),
+        ('大白菜', 1.1, 1.1),
+        ('尖椒2号', 9.0, 9.0),
+        ('萝卜', 0.9, 0.9),
+        ('土豆', '000000', '000000'),
+        ('红萝卜', 5.0, 5.0),
+    ]
+    
+    all_passed = True
+    for veg, expected_price, expected_cost in test_cases:
+        price = find_matching_price(veg, index)
+        cost = find_matching_cost_price(veg, index)
+        ok = (price == expected_price and cost == expected_cost and
+              price == find_matching_price(veg, price_dict, aliases) and
+              cost == find_matching_cost_price(veg, price_dict, aliases))
+        if not ok:
+            all_passed = False
+        print(f"{'✓' if ok else '✗'} {veg:10s} -> {price} / {cost}")
+    
+    # 同一字典反复传入时复用索引，内容修改后重新建立
+    assert build_price_index(price_dict, aliases) is build_price_index(price_dict, aliases)
+    changed = dict(price_dict, 胡萝卜=6.0)
+    assert build_price_index(changed, aliases) is not build_price_index(price_dict, aliases)
+    assert find_matching_price('胡萝卜', changed, aliases) == 6.0
+    
+    # 别名只在订单汉字部分没有一致的菜品时使用，且同义词必须与表中菜品精确一致
+    alias_cases = [
+        ({'土豆(一级品)': 1.2, '马铃薯淀粉': 9.0}, '土豆', 1.2),
+        ({'豆角(一级品)': 3.0, '芸豆(二级品)': 4.0}, '芸豆', 4.0),
+        ({'青椒': 5.0, '尖椒1号': 8.0}, '尖椒', 8.0),
+        ({'番茄酱': 7.0, '西红柿': 4.0}, '番茄', 4.0),
+    ]
+    aliases = [['土豆', '马铃薯'], ['豆角', '芸豆'], ['尖椒', '青椒'], ['西红柿', '番茄']]
+    for table, veg, expected in alias_cases:
+        price = find_matching_price(veg, table, aliases)
+        cost = find_matching_cost_price(veg, table, aliases)
+        ok = price == expected and cost == expected
+        if not ok:
+            all_passed = False
+        print(f"{'✓' if ok else '✗'} 别名 {veg:8s} -> {price} / {cost}")
+    
+    print()
+    assert all_passed
+
+
+def test_table_loader():
+    """测试多组格式与多工作表读取"""
+    print("=" * 60)
+    print("测试3c: 多组格式与多工作表")
+    print("=" * 60)
+    
+    import io
+    import pandas as pd
+    from price_table_handler import read_price_excel
+    
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        pd.DataFrame([
+            ['白萝卜', 0.9, '丝瓜', 5.4, '菠菜', 2.4],
+            ['大白菜', 0.9, '莴笋', 2.9, '西红柿', 2.9],
+        ], columns=['品名', '单价', '品名', '单价', '品名', '单价']).to_excel(writer, sheet_name='蔬菜', index=False)
+        pd.DataFrame([['猪肉', 13.0], ['西红柿', 3.1]], columns=['菜品', '价格']).to_excel(
+            writer, sheet_name='肉类', index=False)
+    
+    data = buffer.getvalue()
+    first_sheet = read_price_excel(io.BytesIO(data))
+    all_sheets = read_price_excel(io.BytesIO(data), all_sheets=True)
+    print(f"✓ 第一个工作表 {len(first_sheet)} 个菜品，全部工作表 {len(all_sheets)} 个菜品")
+    
+    assert list(first_sheet) == ['白萝卜', '丝瓜', '菠菜', '大白菜', '莴笋', '西红柿']
+    assert list(all_sheets) == list(first_sheet) + ['猪肉']
+    assert all_sheets['西红柿'] == 3.1
+    
+    csv_data = '品名,单价,品名,单价\n白萝卜,0.9,丝瓜,5.4\n大白菜,0.9,莴笋,\n'.encode('gb18030')
+    csv_table = read_price_excel(io.BytesIO(csv_data), file_format='csv')
+    print(f"✓ CSV 读取 {len(csv_table)} 个菜品")
+    assert csv_table == {'白萝卜': 0.9, '丝瓜': 5.4, '大白菜': 0.9}
+    
+    # 流式读取与 pandas 读取结果（包括顺序）一致：2 列格式和多组格式
+    from excel_handler import read_purchase_price_excel
+    two_columns = pd.DataFrame([
+        ['白萝卜', 0.9], ['大白菜(一级品)', 1.1], [None, None], ['菠菜', '缺货'], ['白萝卜', 1.0], ['西红柿', 2.9],
+    ], columns=['品名', '进价'])
+    four_columns = pd.DataFrame([
+        ['白萝卜', 0.9, '丝瓜', 5.4], ['大白菜', 0.9, '莴笋', None], ['土豆', 1.5, None, None],
+    ], columns=['品名', '单价', '品名', '单价'])
+    for frame in (two_columns, four_columns):
+        buffer = io.BytesIO()
+        frame.to_excel(buffer, index=False)
+        data = buffer.getvalue()
+        for reader in (read_price_excel, read_purchase_price_excel):
+            table = reader(io.BytesIO(data))
+            streamed = reader(io.BytesIO(data), streaming=True)
+            assert list(streamed.items()) == list(table.items())
+        print(f"✓ 流式读取 {len(frame.columns)} 列表格与 pandas 读取一致：{len(table)} 个菜品")
+    print()
+
+
+def test_price_history():
+    """测试价格历史按日期还原"""
+    print("=" * 60)
+    print("测试3d: 价格历史")
+    print("=" * 60)
+    
+    import tempfile
+    from price_history import PriceHistory
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        history = PriceHistory(os.path.join(tmp_dir, 'history.sqlite3'))
+        history.apply('price', '2026-10-01', {'白萝卜': 0.9, '菠菜': 2.4, '大白菜': 0.9})
+        summary = history.apply('price', '2026-10-03', {'白萝卜': 1.0, '土豆': 1.5, '大白菜': 0.9})
+        print(f"✓ 10-03 变化：{summary}")
+        assert summary == {'added': 1, 'changed': 1, 'removed': 1, 'moved': 0}
+        
+        assert history.as_of('price', '2026-09-30') is None
+        assert history.as_of('price', '2026-10-02') == {'白萝卜': 0.9, '菠菜': 2.4, '大白菜': 0.9}
+        assert list(history.as_of('price', '2026-10-05')) == ['白萝卜', '土豆', '大白菜']
+        
+        # 补录中间的日期，之后的版本不受影响
+        history.apply('price', '2026-10-02', {'菠菜': 2.0})
+        assert history.as_of('price', '2026-10-02') == {'菠菜': 2.0}
+        assert history.as_of('price', '2026-10-03') == {'白萝卜': 1.0, '土豆': 1.5, '大白菜': 0.9}
+        print("✓ 按日期还原正确")
+    print()
+
+
+def test_price_diff():
+    """测试价格表比较和受影响订单"""
+    print("=" * 60)
+    print("测试3e: 价格表比较")
+    print("=" * 60)
+    
+    from price_diff import diff_price_tables, impacted_orders
+    
+    old_table = {'[嘉泽] XS-白萝卜': 0.9, 'XS-菠菜': 2.4, '大白菜一级品': 1.1, '土豆': 1.5}
+    new_table = {'XS-白萝卜': 0.9, 'XS-菠菜': 2.6, '大白菜(一级品)': 1.2, '西红柿': 3.0}
+    diff = diff_price_tables(old_table, new_table)
+    print(diff.to_string(index=False))
+    assert diff['变化'].tolist() == ['改名', '改价', '改价', '新增', '删除']
+    assert diff['新菜品'].tolist()[:4] == ['XS-白萝卜', 'XS-菠菜', '大白菜(一级品)', '西红柿']
+    
+    orders = [
+        {'单位': '一中五食堂', '菜品': '白萝卜', '数量': 20},
+        {'单位': '一中五食堂', '菜品': '菠菜', '数量': 10},
+    ]
+    impacted = impacted_orders(orders, old_table, new_table, old_table, old_table)
+    print(f"✓ 受影响订单 {len(impacted)} 行")
+    assert impacted['菜品'].tolist() == ['菠菜']
+    assert impacted['新定价'].tolist() == [2.6]
+    print()
+
+
+def test_match_cache():
+    """测试匹配结果缓存"""
+    print("=" * 60)
+    print("测试3f: 匹配结果缓存")
+    print("=" * 60)
+    
+    import tempfile
+    import time
+    from match_cache import MatchCache
+    from matcher import build_price_index, _resolve_names
+    
+    index = build_price_index({'胡萝卜': 5.0, '尖椒1号': 8.0})
+    names = ['胡萝卜', '尖椒', '土豆']
+    calls = []
+    
+    def resolve(name):
+        calls.append(name)
+        return index.match_cost_key(name)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = MatchCache(os.path.join(tmp_dir, 'cache.sqlite3'), keep_tables=2)
+        first = _resolve_names(index, names, 'cost', resolve, cache)
+        assert first == {'胡萝卜': '胡萝卜', '尖椒': '尖椒1号', '土豆': None}
+        assert calls == names
+        
+        # 命中缓存（包括"未匹配"结果）的菜品不再执行匹配规则
+        calls.clear()
+        assert _resolve_names(index, names, 'cost', resolve, cache) == first
+        assert calls == []
+        print("✓ 命中缓存时跳过匹配")
+        
+        # 价格表指纹或匹配规则不同时不命中
+        assert cache.get_many('other', 'cost', names) == {}
+        assert cache.get_many(index.fingerprint, 'fuzzy', names) == {}
+        print("✓ 不同价格表、不同规则分别缓存")
+        
+        # 只保留最近使用的 keep_tables 个价格表（间隔一会儿写入，使用时间不相同）
+        time.sleep(0.05)
+        cache.put_many('second', 'cost', {'胡萝卜': '胡萝卜'})
+        time.sleep(0.05)
+        cache.put_many('third', 'cost', {'胡萝卜': '胡萝卜'})
+        assert cache.get_many(index.fingerprint, 'cost', names) == {}
+        assert cache.get_many('second', 'cost', names) == {'胡萝卜': '胡萝卜'}
+        assert cache.get_many('third', 'cost', names) == {'胡萝卜': '胡萝卜'}
+        print("✓ 旧价格表的缓存自动清理")
+    print()
+
+
+def test_table_cache():
+    """测试价格表缓存"""
+    print("=" * 60)
+    print("测试3g: 价格表缓存")
+    print("=" * 60)
+    
+    import tempfile
+    from matcher import PriceIndex, default_alias_groups
+    from table_cache import TableCache
+    
+    loads = []
+    
+    def loader(data):
+        loads.append(data)
+        return {data.decode(): 1.0}
+    
+    # 进程内 LRU：超过 max_entries 时淘汰最久未使用的表
+    cache = TableCache(max_entries=2)
+    for data in (b'A', b'B', b'A', b'C'):
+        cache.get_or_load(data, 'price', loader)
+    assert loads == [b'A', b'B', b'C']
+    cache.get_or_load(b'B', 'price', loader)
+    assert loads == [b'A', b'B', b'C', b'B']
+    print(f"✓ LRU 淘汰最久未使用的表，共解析 {len(loads)} 次")
+    
+    # 别名表修改后重建匹配索引（不重新解析），并写回磁盘缓存
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = TableCache(disk_dir=tmp_dir)
+        table, _ = cache.get_or_load(b'D', 'price', loader)
+        key = next(iter(cache._entries))
+        stale = (table, PriceIndex(table, aliases=[['旧别名', '白萝卜']]))
+        cache._entries[key] = stale
+        cache._write_disk(key, stale)
+        
+        loads.clear()
+        _, index = cache.get_or_load(b'D', 'price', loader)
+        assert loads == []
+        assert index.aliases == default_alias_groups()
+        assert TableCache(disk_dir=tmp_dir)._read_disk(key)[1].aliases == default_alias_groups()
+        print("✓ 别名表修改后重建索引并写回磁盘")
+    print()
+
+
+def test_text_index():
+    """测试文本索引与全表扫描结果一致"""
+    print("=" * 60)
+    print("测试3h: 文本索引")
+    print("=" * 60)
+    
+    import difflib
+    import random
+    from matcher import find_matching_cost_price, find_matching_price, fuzzy_find_price
+    from text_index import SimilarityIndex, SubstringIndex
+    
+    def scan_best_match(text, strings, threshold):
+        """按顺序全表计算相似度，取第一个最高分"""
+        best_score, best_index = 0, None
+        for i, key in enumerate(strings):
+            score = difflib.SequenceMatcher(None, text, key).ratio()
+            if score > best_score:
+                best_score, best_index = score, i
+        if best_index is None or best_score < threshold:
+            return None
+        return best_index, best_score
+    
+    # 最高分相同时取序号小的：序号 1 的上界更高、先计算，序号 0 的真实相似度相同，仍应选序号 0；
+    # 相似度恰好等于阈值时也算匹配
+    strings = ['薯红', '柿红', '西兰花']
+    index = SimilarityIndex(strings)
+    assert index.best_match('红柿', 0.5) == scan_best_match('红柿', strings, 0.5) == (0, 0.5)
+    assert index.best_match('红柿', 0.51) is None
+    
+    # 随机小表与全表扫描逐一比较，阈值包括恰好等于最高分的情况
+    rng = random.Random(0)
+    checked = 0
+    for _ in range(200):
+        strings = [''.join(rng.choice('红薯西柿') for _ in range(rng.randint(1, 5))) for _ in range(12)]
+        index = SimilarityIndex(strings)
+        for _ in range(10):
+            text = ''.join(rng.choice('红薯西柿菜') for _ in range(rng.randint(1, 5)))
+            top = max(difflib.SequenceMatcher(None, text, key).ratio() for key in strings)
+            for threshold in (0.3, 0.6, top):
+                assert index.best_match(text, threshold) == scan_best_match(text, strings, threshold)
+                checked += 1
+    print(f"✓ 相似度匹配与全表扫描一致：{checked} 次查询")
+    
+    # 子串包含索引与逐个比较 x in key / key in x 一致：None 位置不参与，重复字符串保留第一次的序号
+    def scan_containing(text, strings, exclude_self=False):
+        for i, key in enumerate(strings):
+            if key is not None and text in key and not (exclude_self and key == text):
+                return i
+        return None
+    
+    def scan_contained_in(text, strings, min_length=0, exclude_self=False):
+        for i, key in enumerate(strings):
+            if (key is not None and key in text and len(key) >= min_length and
+                    not (exclude_self and key == text)):
+                return i
+        return None
+    
+    strings = ['白萝卜', None, '萝卜', '胡萝卜', '萝卜', None, '红心萝卜', '卜', '大白菜']
+    index = SubstringIndex(strings)
+    assert index.first_containing('萝卜') == 0
+    assert index.first_containing('萝卜', exclude_self=True) == 0
+    assert index.first_containing('红心萝卜', exclude_self=True) is None
+    assert index.first_contained_in('红心萝卜') == 2
+    assert index.first_contained_in('萝卜', min_length=2, exclude_self=True) is None
+    assert index.first_contained_in('萝卜', exclude_self=True) == 7
+    
+    rng = random.Random(1)
+    checked = 0
+    for _ in range(200):
+        strings = [rng.choice([None, ''.join(rng.choice('红白萝卜') for _ in range(rng.randint(1, 4)))])
+                   for _ in range(10)]
+        index = SubstringIndex(strings)
+        for _ in range(10):
+            text = ''.join(rng.choice('红白萝卜菜') for _ in range(rng.randint(1, 4)))
+            for exclude_self in (False, True):
+                assert index.first_containing(text, exclude_self) == scan_containing(text, strings, exclude_self)
+                for min_length in (0, 2):
+                    assert (index.first_contained_in(text, min_length, exclude_self) ==
+                            scan_contained_in(text, strings, min_length, exclude_self))
+                checked += 1
+    print(f"✓ 包含关系匹配与逐个比较一致：{checked} 次查询")
+    
+    # 汉字包含匹配优先选择没有规格的菜品，即使有规格的菜品排在前面
+    for veg, table, expected in (
+            ('萝卜', {'白萝卜(一级品)': 1.1, '胡萝卜': 5.0}, 5.0),
+            ('大白萝卜', {'白萝卜(一级品)': 1.1, '萝卜': 0.8}, 0.8)):
+        assert find_matching_price(veg, table, []) == expected
+        assert find_matching_cost_price(veg, table, []) == expected
+    print("✓ 包含匹配优先无规格菜品")
+    
+    # 精确匹配、包含关系都匹配不到，只能按相似度匹配到"西红柿"
+    table = {'西红柿': 3.0, '红薯': 2.0}
+    assert fuzzy_find_price('番红柿', table) == 3.0
+    assert find_matching_price('番红柿', table) == '000000'
+    print("✓ 相似度匹配：番红柿 -> 西红柿")
+    print()
+
+
 def test_excel():
     """测试Excel读取"""
     print("=" * 60)
@@ -127,6 +515,122 @@ def test_excel():
     print()
 
 
+def test_profit_calculator():
+    """测试利润计算与匹配不到价格的占位值"""
+    print("=" * 60)
+    print("测试4b: 利润计算")
+    print("=" * 60)
+    
+    import io
+    import pandas as pd
+    from profit_calculator import calculate_profit_and_generate_excel
+    
+    orders = [
+        {'单位': '一中五食堂', '菜品': '胡萝卜', '数量': 20},
+        {'单位': '一中五食堂', '菜品': '土豆', '数量': 10},
+        {'单位': '综合四食堂', '菜品': '黄瓜', '数量': 10},
+    ]
+    price_table = {'胡萝卜': 2.0, '黄瓜': 3.0}
+    purchase_table = {'胡萝卜': 1.5}
+    
+    # 直接写入内存
+    output = io.BytesIO()
+    total_profit = calculate_profit_and_generate_excel(orders, price_table, purchase_table, output)
+    sheet = pd.read_excel(io.BytesIO(output.getvalue()), dtype=str)
+    print(f"✓ 总利润：{total_profit}")
+    
+    # 匹配不到价格的显示为 "000000"，不计入合计
+    assert total_profit == 10.0
+    assert sheet['菜品'].tolist()[:3] == ['土豆', '胡萝卜', '黄瓜']
+    assert sheet['定价'].tolist()[:3] == ['000000', '2', '3']
+    assert sheet['总利润'].tolist() == ['000000', '10', '000000', '10']
+    assert sheet['总金额'].tolist()[-1] == '70'
+    
+    # 逐行写入模式结果相同，样式也相同
+    import openpyxl
+    streamed = io.BytesIO()
+    assert calculate_profit_and_generate_excel(orders, price_table, purchase_table, streamed, streaming=True) == total_profit
+    assert pd.read_excel(io.BytesIO(streamed.getvalue()), dtype=str).equals(sheet)
+    for data in (output.getvalue(), streamed.getvalue()):
+        worksheet = openpyxl.load_workbook(io.BytesIO(data)).active
+        assert worksheet['A1'].style == '利润表表头' and worksheet['A5'].style == '利润表总计'
+    print("✓ 逐行写入模式结果一致")
+    
+    # 同一次计算导出为其他格式
+    import json
+    from profit_calculator import compute_profit_report, render_csv, render_json
+    report = compute_profit_report(orders, price_table, purchase_table)
+    assert report.total_profit == total_profit and report.unmatched_dishes == ['土豆', '黄瓜']
+    csv_output = io.BytesIO()
+    render_csv(report, csv_output)
+    assert pd.read_csv(io.BytesIO(csv_output.getvalue()), dtype=str, encoding='utf-8-sig')['总利润'].tolist()[:3] == \
+        ['000000', '10.0', '000000']
+    exported = json.loads(render_json(report))
+    assert exported['总金额'] == 70 and exported['明细'][0]['定价'] is None
+    print(f"✓ 导出 CSV、JSON，未匹配菜品：{report.unmatched_dishes}")
+    
+    # 按单位分表：汇总表加每个单位一个工作表
+    from profit_calculator import render_excel
+    subtotals = report.by_unit()
+    assert subtotals['单位'].tolist() == ['一中五食堂', '综合四食堂'] and subtotals['总金额'].tolist() == [40, 30]
+    by_unit_output = io.BytesIO()
+    render_excel(report, by_unit_output, by_unit=True)
+    sheets = pd.read_excel(io.BytesIO(by_unit_output.getvalue()), sheet_name=None)
+    print(f"✓ 按单位分表：{list(sheets)}")
+    assert list(sheets) == ['汇总', '一中五食堂', '综合四食堂']
+    assert sheets['一中五食堂']['菜品'].tolist()[:2] == ['土豆', '胡萝卜'] and len(sheets['一中五食堂']) == 3
+    assert sheets['综合四食堂'].iloc[-1]['单位'] == '小计' and sheets['汇总'].iloc[-1]['总利润'] == total_profit
+    print()
+
+
+def test_batch_runner():
+    """测试批量生成利润表"""
+    print("=" * 60)
+    print("测试4c: 批量生成")
+    print("=" * 60)
+    
+    import datetime
+    import tempfile
+    from batch_runner import order_file_date, run_batch
+    
+    assert order_file_date('2025.10.8.txt') == datetime.date(2025, 10, 8)
+    assert order_file_date('订单20251008.txt') == datetime.date(2025, 10, 8)
+    assert order_file_date('2025年10月8日.txt') == datetime.date(2025, 10, 8)
+    assert order_file_date('说明.txt') is None
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        order_dir = os.path.join(tmp_dir, '订单')
+        os.makedirs(order_dir)
+        with open(os.path.join(order_dir, '2025.10.8.txt'), 'w', encoding='utf-8') as f:
+            f.write("一中五食堂\n胡萝卜20斤")
+        with open(os.path.join(order_dir, '2025.10.9.txt'), 'w', encoding='gb18030') as f:
+            f.write("综合四食堂\n黄瓜10斤")
+        price_file = os.path.join(tmp_dir, '定价.csv')
+        purchase_file = os.path.join(tmp_dir, '进价.csv')
+        with open(price_file, 'w', encoding='utf-8') as f:
+            f.write("菜品,价格\n胡萝卜,2\n黄瓜,3\n")
+        with open(purchase_file, 'w', encoding='utf-8') as f:
+            f.write("菜品,价格\n胡萝卜,1.5\n黄瓜,2\n")
+        
+        output_dir = os.path.join(tmp_dir, '利润表')
+        results = run_batch(order_dir, output_dir, price_file=price_file, purchase_file=purchase_file, max_workers=1)
+        print(f"✓ 生成 {sorted(os.listdir(output_dir))}")
+        assert sorted(os.listdir(output_dir)) == ['2025.10.8利润表.xlsx', '2025.10.9利润表.xlsx']
+        assert [result for _, _, result in results] == [(10.0, 1, 0), (10.0, 1, 0)]
+        
+        # 命令行：目录或价格历史路径写错时提示并返回 1，不新建历史文件
+        import argparse
+        from main import run_batch_command
+        missing_history = os.path.join(tmp_dir, '历史.sqlite3')
+        for order_path, history in ((os.path.join(tmp_dir, '没有'), None), (order_dir, missing_history)):
+            args = argparse.Namespace(order_dir=order_path, output_dir=output_dir, price=None, purchase=None,
+                                      history=history or missing_history, workers=1, streaming=False, by_unit=False)
+            assert run_batch_command(args) == 1
+        assert not os.path.exists(missing_history)
+        print("✓ 路径不存在时提示错误")
+    print()
+
+
 def test_complete_flow():
     """测试完整流程"""
     print("=" * 60)
@@ -192,7 +696,16 @@ def main():
     
     test_parser()
     test_matcher()
+    test_price_index()
+    test_table_loader()
+    test_price_history()
+    test_price_diff()
+    test_match_cache()
+    test_table_cache()
+    test_text_index()
     test_excel()
+    test_profit_calculator()
+    test_batch_runner()
     test_complete_flow()
     
     print("=" * 60)
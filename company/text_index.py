@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本索引模块 - 为价格表菜品名建立倒排索引，加速相似度匹配
+"""
+
+import difflib
+from collections import Counter
+
+
+class SimilarityIndex:
+    """
+    字符倒排索引 - 用于 SequenceMatcher 相似度匹配的候选筛选
+
+    对每个菜品名按字符建立倒排表（字符 -> [(序号, 出现次数)]）。
+    查询时只访问与查询词有共同字符的菜品，并用共同字符数算出相似度上界
+    （即 SequenceMatcher.quick_ratio），按上界从高到低逐个计算真实相似度，
+    一旦上界低于当前最佳分数或阈值即停止。
+
+    没有共同字符的菜品相似度必为 0；而两个字符串即使没有相同的二元组，
+    相似度也可能超过阈值（如"abc"与"axc"为 0.67），所以按单字建索引
+    才能保证结果与全表扫描一致。
+
+    参数:
+        strings (list): 菜品名列表，序号即列表下标
+    """
+
+    def __init__(self, strings):
+        self.strings = list(strings)
+        self._postings = {}
+        for i, text in enumerate(self.strings):
+            for char, count in Counter(text).items():
+                self._postings.setdefault(char, []).append((i, count))
+
+    def best_match(self, text, threshold):
+        """
+        查找与 text 相似度最高的菜品
+
+        结果与按顺序全表计算 SequenceMatcher(None, text, key).ratio()
+        并取第一个最高分完全一致。
+
+        参数:
+            text (str): 查询的菜品名
+            threshold (float): 相似度阈值（0~1）
+
+        返回:
+            tuple: (序号, 相似度)；没有相似度大于 0 且不低于阈值的菜品时返回 None
+        """
+        overlap = {}
+        for char, query_count in Counter(text).items():
+            for i, count in self._postings.get(char, ()):
+                overlap[i] = overlap.get(i, 0) + min(query_count, count)
+
+        # 上界与 difflib 的计算方式一致，保证与真实相似度可以精确比较
+        candidates = []
+        text_length = len(text)
+        for i, matches in overlap.items():
+            upper_bound = 2.0 * matches / (text_length + len(self.strings[i]))
+            if upper_bound >= threshold:
+                candidates.append((-upper_bound, i))
+        candidates.sort()
+
+        best_score = 0
+        best_index = None
+        for neg_upper_bound, i in candidates:
+            if -neg_upper_bound < best_score:
+                break
+            score = difflib.SequenceMatcher(None, text, self.strings[i]).ratio()
+            if score > best_score or (score == best_score and best_index is not None and i < best_index):
+                best_score = score
+                best_index = i
+
+        if best_index is None or best_score < threshold:
+            return None
+        return best_index, best_score
+
+
+class SubstringIndex:
+    """
+    子串包含索引 - 广义后缀自动机，回答"哪些字符串包含 X"和"哪些字符串被 X 包含"
+
+    所有字符串建成一个后缀自动机，每个状态记录包含该状态子串的
+    最靠前的两个不同字符串序号（排除查询词自身时需要第二个）。
+    查询"包含 X"只需沿自动机走 len(X) 步；查询"被 X 包含"枚举 X 的子串查哈希表。
+    两者都与字符串总数无关。
+
+    参数:
+        strings (list): 字符串列表，序号即列表下标；值为 None 的位置不参与索引，
+                        重复的字符串只保留第一次出现的序号
+    """
+
+    def __init__(self, strings):
+        self._rank = {}
+        for i, text in enumerate(strings):
+            if text is not None:
+                self._rank.setdefault(text, i)
+
+        self._next = [{}]
+        self._link = [-1]
+        self._length = [0]
+        self._first = [()]
+
+        for text, rank in self._rank.items():
+            last = 0
+            for char in text:
+                last = self._extend(last, char)
+                self._first[last] = self._merge(self._first[last], (rank,))
+            if not text:
+                self._first[0] = self._merge(self._first[0], (rank,))
+
+        # 沿后缀链接把序号向上汇总：父状态的子串是子状态子串的后缀
+        order = sorted(range(1, len(self._length)), key=self._length.__getitem__, reverse=True)
+        for state in order:
+            parent = self._link[state]
+            self._first[parent] = self._merge(self._first[parent], self._first[state])
+
+    @staticmethod
+    def _merge(first, second):
+        """合并两组序号，保留最小的两个"""
+        return tuple(sorted(set(first) | set(second))[:2])
+
+    def _new_state(self, length, link, transitions):
+        self._next.append(transitions)
+        self._link.append(link)
+        self._length.append(length)
+        self._first.append(())
+        return len(self._length) - 1
+
+    def _clone(self, p, q, char):
+        """从状态 q 拆出长度为 len(p)+1 的新状态，并把指向 q 的转移改到新状态"""
+        clone = self._new_state(self._length[p] + 1, self._link[q], dict(self._next[q]))
+        while p != -1 and self._next[p].get(char) == q:
+            self._next[p][char] = clone
+            p = self._link[p]
+        self._link[q] = clone
+        return clone
+
+    def _extend(self, last, char):
+        """在状态 last 后追加一个字符，返回新前缀对应的状态"""
+        if char in self._next[last]:
+            q = self._next[last][char]
+            if self._length[q] == self._length[last] + 1:
+                return q
+            return self._clone(last, q, char)
+
+        current = self._new_state(self._length[last] + 1, 0, {})
+        p = last
+        while p != -1 and char not in self._next[p]:
+            self._next[p][char] = current
+            p = self._link[p]
+        if p != -1:
+            q = self._next[p][char]
+            if self._length[p] + 1 == self._length[q]:
+                self._link[current] = q
+            else:
+                self._link[current] = self._clone(p, q, char)
+        return current
+
+    def first_containing(self, text, exclude_self=False):
+        """
+        返回包含 text 的第一个字符串序号
+
+        参数:
+            text (str): 查询文本
+            exclude_self (bool): 是否排除与 text 完全相同的字符串
+
+        返回:
+            int or None: 序号，找不到返回 None
+        """
+        state = 0
+        for char in text:
+            state = self._next[state].get(char)
+            if state is None:
+                return None
+        for rank in self._first[state]:
+            if not (exclude_self and self._rank.get(text) == rank):
+                return rank
+        return None
+
+    def first_contained_in(self, text, min_length=0, exclude_self=False):
+        """
+        返回被 text 包含（是 text 的子串）的第一个字符串序号
+
+        参数:
+            text (str): 查询文本
+            min_length (int): 字符串的最小长度
+            exclude_self (bool): 是否排除与 text 完全相同的字符串
+
+        返回:
+            int or None: 序号，找不到返回 None
+        """
+        best = None
+        if min_length == 0 and '' in self._rank and not (exclude_self and not text):
+            best = self._rank['']
+        length = len(text)
+        for start in range(length):
+            for end in range(start + max(min_length, 1), length + 1):
+                if exclude_self and start == 0 and end == length:
+                    continue
+                rank = self._rank.get(text[start:end])
+                if rank is not None and (best is None or rank < best):
+                    best = rank
+        return best